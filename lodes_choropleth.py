@@ -3,12 +3,12 @@ LODES Tract-Level Choropleth Map
 Aggregate to census tract level for clearer geographic patterns
 Shows where each sector is strongest
 """
-import pandas as pd
 import numpy as np
 from pathlib import Path
-import json
+import orjson
 import warnings
 import ssl
+from lodes_common import CNS_COLS, load_la_tract_agg
 ssl._create_default_https_context = ssl._create_unverified_context
 warnings.filterwarnings('ignore')
 
@@ -36,56 +36,53 @@ SECTORS = {
     'CNS20': ('92', 'Public Admin', '#7f8c8d'),
 }
 
+# Lookup arrays indexed by sector position (CNS01 -> 0 ... CNS20 -> 19)
+CNS_CODES = np.array(list(SECTORS))
+SECTOR_NAMES = np.array([name for _, name, _ in SECTORS.values()])
+SECTOR_COLORS = np.array([color for _, _, color in SECTORS.values()])
+
+# Properties for tract polygons with no LODES blocks
+NO_DATA_PROPS = {'total_jobs': 0, 'dominant_sector': 'None', 'sector_color': '#333', 'concentration': 0}
+
 
 def load_and_aggregate():
     """Load LODES and aggregate to tract level."""
     print("Loading LODES data...")
-    df = pd.read_parquet('data/lodes_wac_blocks_ca_2021.parquet')
-    
-    # Filter to LA County
-    df['w_geocode'] = df['w_geocode'].astype(str).str.zfill(15)
-    df['county'] = df['w_geocode'].str[2:5]
-    df = df[df['county'] == '037'].copy()
-    
-    # Extract tract
-    df['tract'] = df['w_geocode'].str[:11]
-    
-    # Aggregate to tract level
-    print("Aggregating to tract level...")
-    cns_cols = [f'CNS{i:02d}' for i in range(1, 21)]
-    agg_cols = ['C000'] + cns_cols
-    
-    tract_df = df.groupby('tract')[agg_cols].sum().reset_index()
-    tract_df.columns = ['tract', 'total_jobs'] + cns_cols
+    tract_df = load_la_tract_agg().copy()
+    sums = tract_df[['total_jobs'] + CNS_COLS].to_numpy()
     
     print(f"Tracts: {len(tract_df):,}")
     
     # Calculate dominant sector per tract
-    tract_df['dominant_cns'] = tract_df[cns_cols].idxmax(axis=1)
-    tract_df['dominant_jobs'] = tract_df[cns_cols].max(axis=1)
+    cns_jobs = sums[:, 1:]
+    codes = cns_jobs.argmax(axis=1)
+    tract_df['dominant_cns'] = CNS_CODES[codes]
+    tract_df['dominant_jobs'] = cns_jobs[np.arange(len(codes)), codes]
     tract_df['concentration'] = tract_df['dominant_jobs'] / tract_df['total_jobs']
     
     # Map to sector names
-    tract_df['dominant_sector'] = tract_df['dominant_cns'].map(
-        lambda x: SECTORS.get(x, ('XX', 'Unknown', '#888'))[1]
-    )
-    tract_df['sector_color'] = tract_df['dominant_cns'].map(
-        lambda x: SECTORS.get(x, ('XX', 'Unknown', '#888'))[2]
-    )
+    tract_df['dominant_sector'] = SECTOR_NAMES[codes]
+    tract_df['sector_color'] = SECTOR_COLORS[codes]
     
     # Calculate location quotient for each sector
     # LQ = (sector_jobs_tract / total_jobs_tract) / (sector_jobs_county / total_jobs_county)
-    county_totals = tract_df[['total_jobs'] + cns_cols].sum()
-    for cns in cns_cols:
-        county_share = county_totals[cns] / county_totals['total_jobs']
-        tract_df[f'{cns}_share'] = tract_df[cns] / tract_df['total_jobs'].replace(0, np.nan)
-        tract_df[f'{cns}_lq'] = tract_df[f'{cns}_share'] / county_share
+    total = sums[:, :1]
+    inv_total = np.where(total == 0, np.nan, 1.0 / np.maximum(total, 1))
+    county_share = cns_jobs.sum(axis=0) / sums[:, 0].sum()
+    lq = cns_jobs * inv_total / county_share
+    tract_df[[f'{cns}_lq' for cns in CNS_COLS]] = lq
     
     return tract_df
 
 
 def download_tract_boundaries():
-    """Download tract boundaries GeoJSON from Census."""
+    """Download tract boundaries GeoJSON from Census (cached to data/)."""
+    cache_path = Path('data/la_tracts.geojson')
+    
+    if cache_path.exists():
+        print("Loading cached tract boundaries...")
+        return orjson.loads(cache_path.read_bytes())
+    
     print("Downloading tract boundaries...")
     
     # Census TIGER API for LA County tracts
@@ -97,14 +94,26 @@ def download_tract_boundaries():
     params = {
         'where': "STATE='06' AND COUNTY='037'",
         'outFields': 'GEOID,BASENAME',
+        'returnGeometry': 'true',
+        'geometryPrecision': 5,
         'f': 'geojson',
         'outSR': '4326'
     }
     
     response = requests.get(url, params=params)
     if response.status_code == 200:
-        geojson = response.json()
+        geojson = orjson.loads(response.content)
         print(f"Downloaded {len(geojson['features'])} tract boundaries")
+        
+        # Keep only the properties the map reads; everything here ends up
+        # embedded in the HTML
+        for feature in geojson['features']:
+            props = feature['properties']
+            feature['properties'] = {'GEOID': props['GEOID'], 'BASENAME': props.get('BASENAME')}
+        
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_bytes(orjson.dumps(geojson))
+        
         return geojson
     else:
         print(f"Failed to download: {response.status_code}")
@@ -124,37 +133,38 @@ def create_choropleth_map(tract_df, output_path='output/lodes_choropleth.html'):
     # Merge data with geojson
     # Census GEOID is 12 chars (state2 + county3 + tract7), LODES is 11 chars (state2 + county3 + tract6)
     # Need to match on first 11 characters
-    tract_lookup = tract_df.set_index('tract').to_dict('index')
+    # Build each tract's full property dict once, then merge it into the
+    # matching feature with a single update()
+    total = tract_df['total_jobs'].tolist()
+    sector = tract_df['dominant_sector'].tolist()
+    color = tract_df['sector_color'].tolist()
+    conc = (tract_df['concentration'].to_numpy() * 100).round(1).tolist()
+    cns_cols = list(SECTORS)
+    jobs_mat = tract_df[cns_cols].to_numpy().tolist()
+    lq_mat = tract_df[[f'{cns}_lq' for cns in cns_cols]].to_numpy().round(2).tolist()
+    
+    base_keys = ('total_jobs', 'dominant_sector', 'sector_color', 'concentration')
+    sector_keys = [key for name in SECTOR_NAMES.tolist() for key in (f'{name}_jobs', f'{name}_lq')]
+    props_for = {}
+    rows = zip(tract_df['tract'].tolist(), total, sector, color, conc, jobs_mat, lq_mat)
+    for tract, *base, jobs_row, lq_row in rows:
+        props = dict(zip(base_keys, base))
+        props.update(zip(sector_keys, (v for pair in zip(jobs_row, lq_row) for v in pair)))
+        props_for[tract] = props
     
     for feature in geojson['features']:
-        geoid = feature['properties']['GEOID']
-        # Try both full GEOID and truncated version
-        tract_id = geoid[:11] if len(geoid) > 11 else geoid
-        if tract_id in tract_lookup:
-            data = tract_lookup[tract_id]
-            feature['properties']['total_jobs'] = int(data['total_jobs'])
-            feature['properties']['dominant_sector'] = data['dominant_sector']
-            feature['properties']['sector_color'] = data['sector_color']
-            feature['properties']['concentration'] = round(data['concentration'] * 100, 1)
-            # Add sector-specific data
-            for cns, (naics, name, color) in SECTORS.items():
-                if cns in data:
-                    feature['properties'][f'{name}_jobs'] = int(data[cns])
-                    feature['properties'][f'{name}_lq'] = round(data.get(f'{cns}_lq', 0), 2)
-        else:
-            feature['properties']['total_jobs'] = 0
-            feature['properties']['dominant_sector'] = 'None'
-            feature['properties']['sector_color'] = '#333'
-            feature['properties']['concentration'] = 0
+        props = feature['properties']
+        props.update(props_for.get(int(props['GEOID'][:11]), NO_DATA_PROPS))
     
     # Calculate sector summaries
+    # One column-wise sum and one value count instead of two passes per sector
+    totals = dict(zip(cns_cols, tract_df[cns_cols].to_numpy(np.int64).sum(axis=0).tolist()))
+    dominant_counts = tract_df['dominant_cns'].value_counts()
     sector_stats = {}
     for cns, (naics, name, color) in SECTORS.items():
-        total = int(tract_df[cns].sum())
-        tracts_dominant = int((tract_df['dominant_cns'] == cns).sum())
         sector_stats[name] = {
-            'total_jobs': total,
-            'tracts_dominant': tracts_dominant,
+            'total_jobs': totals[cns],
+            'tracts_dominant': int(dominant_counts.get(cns, 0)),
             'color': color,
             'cns': cns
         }
@@ -162,6 +172,12 @@ def create_choropleth_map(tract_df, output_path='output/lodes_choropleth.html'):
     # Sort by total jobs
     sector_stats = dict(sorted(sector_stats.items(), key=lambda x: -x[1]['total_jobs']))
     
+    # Embed as TopoJSON: shared tract edges are stored once as arcs and
+    # coordinates are quantized to a 1e5 grid (~1.5 m across the county)
+    import topojson
+    topo_str = topojson.Topology(geojson, prequantize=1e5, object_name='tracts').to_json()
+    sector_str = orjson.dumps(sector_stats).decode()
+    
     html = f'''<!DOCTYPE html>
 <html>
 <head>
@@ -170,6 +186,7 @@ def create_choropleth_map(tract_df, output_path='output/lodes_choropleth.html'):
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />
     <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+    <script src="https://unpkg.com/topojson-client@3"></script>
     <style>
         * {{ margin: 0; padding: 0; box-sizing: border-box; }}
         body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; }}
@@ -324,8 +341,9 @@ def create_choropleth_map(tract_df, output_path='output/lodes_choropleth.html'):
 
     <script>
         // Data
-        const geojson = {json.dumps(geojson)};
-        const sectorStats = {json.dumps(sector_stats)};
+        const topo = {topo_str};
+        const geojson = topojson.feature(topo, topo.objects.tracts);
+        const sectorStats = {sector_str};
         
         // State
         let currentView = 'dominant';
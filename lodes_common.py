@@ -0,0 +1,103 @@
+"""
+Shared LODES loading for the LA County maps
+Reads the cached statewide WAC parquet and memoizes the tract aggregation
+"""
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+from pathlib import Path
+from functools import lru_cache
+import hashlib
+
+LODES_CACHE = Path('data/lodes_wac_blocks_ca_2021.parquet')
+TRACT_AGG_DIR = Path('data')
+CENTROIDS_URL = "https://www2.census.gov/geo/docs/reference/cenpop2020/tract/CenPop2020_Mean_TR06.txt"
+CENTROIDS_CACHE = Path('data/cenpop2020_tr06.parquet')
+
+CNS_COLS = [f'CNS{i:02d}' for i in range(1, 21)]
+
+# w_geocode is SSCCCTTTTTTBBBB, so all LA County blocks (06037) fall in one
+# contiguous integer range that Parquet row-group statistics can prune on
+LA_GEOCODE_MIN = 6037 * 10**10
+LA_GEOCODE_MAX = 6038 * 10**10
+
+
+def read_la_blocks(path=LODES_CACHE, columns=None):
+    """Read LA County blocks from the cached parquet.
+
+    Only the requested columns are read, and the geocode range lets parquet
+    skip row groups for other counties.
+    """
+    if columns is None:
+        columns = ['w_geocode', 'C000'] + CNS_COLS
+    return pq.read_table(
+        path,
+        columns=columns,
+        filters=[('w_geocode', '>=', LA_GEOCODE_MIN), ('w_geocode', '<', LA_GEOCODE_MAX)],
+    ).to_pandas()
+
+
+def sum_by_key(keys, values):
+    """Sum the rows of a 2-D array that share a key.
+
+    Returns the sorted unique keys and one summed row per key. Rows are
+    gathered into contiguous runs (a no-op for the geocode-sorted LODES
+    cache) and reduced with a single np.add.reduceat pass.
+    """
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    values = values[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(values, starts, axis=0)
+
+
+def aggregate_to_tracts(blocks):
+    """Sum block job counts to tracts (tract = leading 11 geocode digits)."""
+    tracts, sums = sum_by_key(
+        blocks['w_geocode'].to_numpy(np.int64) // 10**4,
+        blocks[['C000'] + CNS_COLS].to_numpy(),
+    )
+    tract_df = pd.DataFrame(sums, columns=['total_jobs'] + CNS_COLS)
+    tract_df.insert(0, 'tract', tracts)
+    return tract_df
+
+
+def tract_agg_path(source=LODES_CACHE):
+    """Tract aggregation cache path, versioned on the source file's mtime and size."""
+    stat = Path(source).stat()
+    key = hashlib.md5(f'{source}:{stat.st_mtime_ns}:{stat.st_size}'.encode()).hexdigest()[:8]
+    return TRACT_AGG_DIR / f'lodes_la_tract_agg_v{key}.parquet'
+
+
+@lru_cache(maxsize=None)
+def load_la_tract_agg(source=LODES_CACHE):
+    """Return LA County tract job totals, reusing the on-disk aggregate when current."""
+    cache_path = tract_agg_path(source)
+    if cache_path.exists():
+        print(f"Using tract cache: {cache_path}")
+        return pd.read_parquet(cache_path)
+
+    tract_df = aggregate_to_tracts(read_la_blocks(source))
+
+    # Drop aggregates built from an older copy of the source
+    for stale in TRACT_AGG_DIR.glob('lodes_la_tract_agg_v*.parquet'):
+        stale.unlink()
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tract_df.to_parquet(cache_path, index=False)
+    print(f"Cached tract aggregate to: {cache_path}")
+
+    return tract_df
+
+
+def load_tract_centroids():
+    """Load CA 2020 tract population centroids, downloading them once."""
+    if CENTROIDS_CACHE.exists():
+        print(f"Using cache: {CENTROIDS_CACHE}")
+        return pd.read_parquet(CENTROIDS_CACHE)
+
+    centroids = pd.read_csv(CENTROIDS_URL)
+    CENTROIDS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    centroids.to_parquet(CENTROIDS_CACHE, index=False)
+    print(f"Cached to: {CENTROIDS_CACHE}")
+
+    return centroids
@@ -7,11 +7,18 @@ https://lehd.ces.census.gov/data/lodes/
 """
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import requests
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import io
+import json
 import warnings
 import ssl
-import urllib.request
+from lodes_common import load_la_tract_agg, load_tract_centroids, read_la_blocks
 warnings.filterwarnings('ignore')
 
 # Fix SSL certificate issue on macOS
@@ -22,6 +29,11 @@ YEAR = 2021  # Latest available year with good coverage
 STATE = 'ca'
 LA_COUNTY_FIPS = '037'
 
+CACHE_ROW_GROUP_SIZE = 50000
+DOWNLOAD_PARTS = 8
+# (connect, read) seconds per request, so a stalled range fails instead of hanging the pool
+DOWNLOAD_TIMEOUT = (10, 60)
+
 # NAICS 2-digit sector mapping (LODES uses CNS codes)
 NAICS_SECTORS = {
     'CNS01': ('11', 'Agriculture'),
@@ -46,6 +58,11 @@ NAICS_SECTORS = {
     'CNS20': ('92', 'Public Admin'),
 }
 
+# Lookup arrays indexed by sector position (CNS01 -> 0 ... CNS20 -> 19)
+CNS_CODES = np.array(list(NAICS_SECTORS))
+NAICS_CODES = np.array([naics for naics, _ in NAICS_SECTORS.values()])
+SECTOR_NAMES = np.array([name for _, name in NAICS_SECTORS.values()])
+
 # Colors for each sector (RGB)
 SECTOR_COLORS = {
     'Healthcare': [46, 204, 113],
@@ -70,9 +87,39 @@ SECTOR_COLORS = {
     'Management': [108, 92, 231],
 }
 
+SECTOR_HEX = {name: '#{:02x}{:02x}{:02x}'.format(*rgb) for name, rgb in SECTOR_COLORS.items()}
+
+# RGB rows in SECTOR_NAMES order, indexed by sector_name category codes
+SECTOR_RGB = np.array([SECTOR_COLORS[name] for name in SECTOR_NAMES])
+
+
+def fetch_parallel(url, parts=DOWNLOAD_PARTS):
+    """Fetch a file into memory with concurrent HTTP range requests.
+    
+    Falls back to a single GET when the server does not advertise byte ranges.
+    """
+    head = requests.head(url, allow_redirects=True, timeout=DOWNLOAD_TIMEOUT)
+    head.raise_for_status()
+    size = int(head.headers.get('Content-Length', 0))
+    if head.headers.get('Accept-Ranges') != 'bytes' or size == 0:
+        response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+    
+    def fetch_range(start, end):
+        response = requests.get(url, headers={'Range': f'bytes={start}-{end - 1}'},
+                                timeout=DOWNLOAD_TIMEOUT)
+        if response.status_code != 206:
+            raise RuntimeError(f"Range request failed: {response.status_code}")
+        return response.content
+    
+    bounds = np.linspace(0, size, parts + 1).astype(np.int64)
+    with ThreadPoolExecutor(max_workers=parts) as pool:
+        return b''.join(pool.map(fetch_range, bounds[:-1], bounds[1:]))
+
 
 def download_lodes_wac_blocks(year=YEAR, state=STATE):
-    """Download LODES WAC at block level."""
+    """Download LODES WAC at block level and return the cached parquet path."""
     
     url = f"https://lehd.ces.census.gov/data/lodes/LODES8/{state}/wac/{state}_wac_S000_JT00_{year}.csv.gz"
     
@@ -82,25 +129,48 @@ def download_lodes_wac_blocks(year=YEAR, state=STATE):
     cache_path = Path(f'data/lodes_wac_blocks_{state}_{year}.parquet')
     
     if cache_path.exists():
-        print(f"Loading from cache: {cache_path}")
-        return pd.read_parquet(cache_path)
-    
-    df = pd.read_csv(url, compression='gzip')
-    print(f"Downloaded: {len(df):,} blocks")
-    
+        print(f"Using cache: {cache_path}")
+        return cache_path
+    
+    # Decompress the gzip straight into Arrow's multithreaded CSV reader, keeping
+    # only the job-count columns with a fixed schema (no inference pass).
+    # Block job counts fit comfortably in int32; an out-of-range value makes
+    # the reader raise rather than wrap.
+    column_types = {'w_geocode': pa.int64()}
+    column_types.update({col: pa.int32() for col in ['C000'] + list(NAICS_SECTORS)})
+    data = fetch_parallel(url)
+    with gzip.GzipFile(fileobj=io.BytesIO(data)) as csv_file:
+        table = pacsv.read_csv(
+            csv_file,
+            read_options=pacsv.ReadOptions(use_threads=True, block_size=16 << 20),
+            convert_options=pacsv.ConvertOptions(
+                column_types=column_types,
+                include_columns=list(column_types),
+            ),
+        )
+    print(f"Downloaded: {table.num_rows:,} blocks")
+    
+    # Sorted by geocode with modest row groups so county reads can skip
+    # every row group outside the requested geocode range
+    table = table.sort_by('w_geocode')
     cache_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(cache_path)
+    pq.write_table(
+        table,
+        cache_path,
+        row_group_size=CACHE_ROW_GROUP_SIZE,
+        sorting_columns=[pq.SortingColumn(0)],
+        compression='zstd',
+        compression_level=3,
+        use_dictionary=False,
+    )
     print(f"Cached to: {cache_path}")
     
-    return df
+    return cache_path
 
 
-def filter_la_county(df):
-    """Filter to LA County blocks."""
-    df['w_geocode'] = df['w_geocode'].astype(str).str.zfill(15)
-    df['county'] = df['w_geocode'].str[2:5]
-    
-    la_df = df[df['county'] == LA_COUNTY_FIPS].copy()
+def filter_la_county(cache_path):
+    """Read only LA County blocks from the cached parquet."""
+    la_df = read_la_blocks(cache_path)
     print(f"LA County blocks: {len(la_df):,}")
     
     return la_df
@@ -109,15 +179,18 @@ def filter_la_county(df):
 def calculate_dominant_sector(df):
     """Find dominant NAICS sector for each block."""
     
-    cns_cols = [c for c in df.columns if c.startswith('CNS')]
+    cns_jobs = df[list(NAICS_SECTORS)].to_numpy()
+    codes = cns_jobs.argmax(axis=1)
     
-    df['dominant_sector'] = df[cns_cols].idxmax(axis=1)
-    df['dominant_jobs'] = df[cns_cols].max(axis=1)
+    df['dominant_sector'] = CNS_CODES[codes]
+    df['dominant_jobs'] = cns_jobs[np.arange(len(codes)), codes]
     df['total_jobs'] = df['C000']
     
-    df['naics_2digit'] = df['dominant_sector'].map(lambda x: NAICS_SECTORS.get(x, ('XX', 'Unknown'))[0])
-    df['sector_name'] = df['dominant_sector'].map(lambda x: NAICS_SECTORS.get(x, ('XX', 'Unknown'))[1])
-    df['sector_concentration'] = df['dominant_jobs'] / df['total_jobs'].replace(0, np.nan)
+    df['naics_2digit'] = NAICS_CODES[codes]
+    df['sector_name'] = pd.Categorical.from_codes(codes, categories=SECTOR_NAMES)
+    total = df['total_jobs'].to_numpy()
+    inv_total = np.where(total == 0, np.nan, 1.0 / np.maximum(total, 1))
+    df['sector_concentration'] = df['dominant_jobs'].to_numpy() * inv_total
     
     return df
 
@@ -126,27 +199,30 @@ def get_block_coordinates(df):
     """Get coordinates for blocks using tract centroids + jitter."""
     print("\nGetting block coordinates...")
     
-    df['tract'] = df['w_geocode'].str[:11]
-    
-    # Download CA tract centroids
-    url = "https://www2.census.gov/geo/docs/reference/cenpop2020/tract/CenPop2020_Mean_TR06.txt"
-    print("Downloading CA tract centroids...")
+    # Tract is the leading 11 digits of the 15-digit block geocode
+    df['tract'] = df['w_geocode'].to_numpy(np.int64) // 10**4
     
-    centroids = pd.read_csv(url)
-    centroids['STATEFP'] = centroids['STATEFP'].astype(str).str.zfill(2)
-    centroids['COUNTYFP'] = centroids['COUNTYFP'].astype(str).str.zfill(3)
-    centroids['TRACTCE'] = centroids['TRACTCE'].astype(str).str.zfill(6)
-    centroids['tract'] = centroids['STATEFP'] + centroids['COUNTYFP'] + centroids['TRACTCE']
+    # CA tract centroids (downloaded once, then cached)
+    print("Loading CA tract centroids...")
+    centroids = load_tract_centroids()
+    centroids['tract'] = (centroids['STATEFP'].astype(np.int64) * 10**9
+                          + centroids['COUNTYFP'].astype(np.int64) * 10**6
+                          + centroids['TRACTCE'].astype(np.int64))
     
-    la_centroids = centroids[centroids['COUNTYFP'] == LA_COUNTY_FIPS][['tract', 'LATITUDE', 'LONGITUDE']]
+    la_centroids = centroids[centroids['COUNTYFP'] == int(LA_COUNTY_FIPS)][['tract', 'LATITUDE', 'LONGITUDE']]
     print(f"LA County tract centroids: {len(la_centroids):,}")
     
-    df = df.merge(la_centroids, on='tract', how='left')
+    # Look up each block's tract centroid by index instead of a full merge
+    cent = la_centroids.set_index('tract')
+    tracts = df['tract'].to_numpy()
+    lat = cent['LATITUDE'].reindex(tracts).to_numpy()
+    lon = cent['LONGITUDE'].reindex(tracts).to_numpy()
     
     # Jitter blocks within tract
-    np.random.seed(42)
-    df['lat'] = df['LATITUDE'] + np.random.uniform(-0.002, 0.002, len(df))
-    df['lon'] = df['LONGITUDE'] + np.random.uniform(-0.002, 0.002, len(df))
+    rng = np.random.default_rng(42)
+    jitter = rng.uniform(-0.002, 0.002, (len(df), 2)).astype(np.float32)
+    df['lat'] = lat + jitter[:, 0]
+    df['lon'] = lon + jitter[:, 1]
     
     return df
 
@@ -154,22 +230,31 @@ def get_block_coordinates(df):
 def create_pydeck_map(df, output_path='output/lodes_naics_map.html'):
     """Create interactive map using pydeck."""
     import pydeck as pdk
+    from pydeck.io.html import deck_to_html
     
-    map_df = df[(df['total_jobs'] > 0) & df['lat'].notna()].copy()
+    map_df = df[(df['total_jobs'] > 0) & df['lat'].notna()]
     print(f"\nBlocks for map: {len(map_df):,}")
     
-    map_df['color'] = map_df['sector_name'].map(
-        lambda x: SECTOR_COLORS.get(x, [128, 128, 128])
-    )
-    map_df['radius'] = np.sqrt(map_df['total_jobs']) * 8
-    
-    # Prepare data for pydeck
-    map_data = map_df[['lon', 'lat', 'radius', 'color', 'sector_name', 'total_jobs', 'sector_concentration']].copy()
-    map_data['sector_concentration'] = (map_data['sector_concentration'] * 100).round(1)
+    # Only the columns the layer and tooltip read, as plain arrays
+    codes = map_df['sector_name'].cat.codes.to_numpy()
+    jobs = map_df['total_jobs'].to_numpy()
+    map_data = {
+        'lon': map_df['lon'].to_numpy().round(5),
+        'lat': map_df['lat'].to_numpy().round(5),
+        'radius': (np.sqrt(jobs) * 8).round(1),
+        'color': SECTOR_RGB[codes],
+        'sector_name': SECTOR_NAMES[codes],
+        'total_jobs': jobs,
+        'sector_concentration': (map_df['sector_concentration'].to_numpy() * 100).round(1),
+    }
+    records = [
+        dict(zip(map_data, row))
+        for row in zip(*(col.tolist() for col in map_data.values()))
+    ]
     
     layer = pdk.Layer(
         'ScatterplotLayer',
-        data=map_data,
+        data=[],
         get_position=['lon', 'lat'],
         get_radius='radius',
         get_fill_color='color',
@@ -200,14 +285,28 @@ def create_pydeck_map(df, output_path='output/lodes_naics_map.html'):
         map_style='mapbox://styles/mapbox/dark-v10'
     )
     
+    # deck.to_html() pretty-prints the whole spec with indent=2, which for
+    # tens of thousands of rows is mostly whitespace. Serialize the spec
+    # without data, then add the records and render it compactly.
+    spec = json.loads(deck.to_json())
+    spec['layers'][0]['data'] = records
+    
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    deck.to_html(output_path)
+    deck_to_html(
+        json.dumps(spec, separators=(',', ':')),
+        mapbox_key=deck.mapbox_key,
+        tooltip=tooltip,
+        filename=output_path,
+        notebook_display=False,
+    )
     print(f"✅ Pydeck map saved to: {output_path}")
 
 
 def create_folium_map(df, output_path='output/lodes_naics_map_folium.html'):
     """Create interactive map using folium (no mapbox token needed)."""
     import folium
+    from branca.element import MacroElement
+    from jinja2 import Template
     
     map_df = df[(df['total_jobs'] > 0) & df['lat'].notna()].copy()
     print(f"\nBlocks for map: {len(map_df):,}")
@@ -223,20 +322,44 @@ def create_folium_map(df, output_path='output/lodes_naics_map_folium.html'):
         tiles='cartodbdark_matter'
     )
     
-    for _, row in map_df.iterrows():
-        color = SECTOR_COLORS.get(row['sector_name'], [128, 128, 128])
-        hex_color = f"#{color[0]:02x}{color[1]:02x}{color[2]:02x}"
-        
-        folium.CircleMarker(
-            location=[row['lat'], row['lon']],
-            radius=max(2, np.sqrt(row['total_jobs']) / 3),
-            color=hex_color,
-            fill=True,
-            fillColor=hex_color,
-            fillOpacity=0.7,
-            weight=0,
-            popup=f"<b>{row['sector_name']}</b><br/>Jobs: {row['total_jobs']}"
-        ).add_to(m)
+    # Draw every marker client-side from one embedded array instead of
+    # building a folium.CircleMarker per row
+    codes = map_df['sector_name'].cat.codes.to_numpy()
+    colors = [SECTOR_HEX[name] for name in SECTOR_NAMES]
+    jobs = map_df['total_jobs'].to_numpy()
+    radius = np.maximum(2, np.sqrt(jobs) / 3)
+    points = list(zip(
+        map_df['lat'].tolist(), map_df['lon'].tolist(),
+        radius.round(2).tolist(), codes.tolist(), jobs.tolist()
+    ))
+    
+    markers = MacroElement()
+    markers._template = Template('''
+        {% macro script(this, kwargs) %}
+        (function() {
+            var names = {{ this.names }};
+            var colors = {{ this.colors }};
+            var points = {{ this.points }};
+            var layer = L.layerGroup();
+            for (var i = 0; i < points.length; i++) {
+                var p = points[i];
+                L.circleMarker([p[0], p[1]], {
+                    radius: p[2],
+                    color: colors[p[3]],
+                    fill: true,
+                    fillColor: colors[p[3]],
+                    fillOpacity: 0.7,
+                    weight: 0
+                }).bindPopup('<b>' + names[p[3]] + '</b><br/>Jobs: ' + p[4]).addTo(layer);
+            }
+            layer.addTo({{ this._parent.get_name() }});
+        })();
+        {% endmacro %}
+    ''')
+    markers.names = json.dumps(SECTOR_NAMES.tolist())
+    markers.colors = json.dumps(colors)
+    markers.points = json.dumps(points)
+    m.add_child(markers)
     
     # Add legend
     legend_html = '''
@@ -245,8 +368,7 @@ def create_folium_map(df, output_path='output/lodes_naics_map_folium.html'):
                 font-size: 11px; color: white;">
     <b>NAICS Sectors</b><br>
     '''
-    for sector, color in list(SECTOR_COLORS.items())[:10]:
-        hex_color = f"#{color[0]:02x}{color[1]:02x}{color[2]:02x}"
+    for sector, hex_color in list(SECTOR_HEX.items())[:10]:
         legend_html += f'<span style="color:{hex_color}">●</span> {sector}<br>'
     legend_html += '</div>'
     m.get_root().html.add_child(folium.Element(legend_html))
@@ -259,7 +381,7 @@ def create_folium_map(df, output_path='output/lodes_naics_map_folium.html'):
 def create_sector_summary(df, output_path='output/sector_summary.csv'):
     """Create summary statistics by sector."""
     
-    summary = df.groupby('sector_name').agg({
+    summary = df.groupby('sector_name', observed=True).agg({
         'w_geocode': 'count',
         'total_jobs': 'sum',
         'dominant_jobs': 'sum',
@@ -287,10 +409,10 @@ def main():
     print("=" * 60)
     
     # 1. Download LODES WAC blocks
-    df = download_lodes_wac_blocks()
+    cache_path = download_lodes_wac_blocks()
     
-    # 2. Filter to LA County
-    la_df = filter_la_county(df)
+    # 2. Read LA County blocks
+    la_df = filter_la_county(cache_path)
     
     # 3. Calculate dominant sector per block
     la_df = calculate_dominant_sector(la_df)
@@ -301,6 +423,10 @@ def main():
     # 5. Create summary
     create_sector_summary(la_df)
     
+    # Prime the shared tract aggregate used by lodes_choropleth.py
+    tract_df = load_la_tract_agg(cache_path)
+    print(f"LA County tracts with jobs: {len(tract_df):,}")
+    
     # 6. Create maps
     try:
         create_pydeck_map(la_df)
@@ -312,8 +438,12 @@ def main():
     # 7. Save processed data
     output_cols = ['w_geocode', 'tract', 'total_jobs', 'dominant_sector', 
                    'naics_2digit', 'sector_name', 'sector_concentration', 'lat', 'lon']
+    out_df = la_df[output_cols].copy()
+    out_df['w_geocode'] = out_df['w_geocode'].astype(str).str.zfill(15)
+    out_df['tract'] = out_df['tract'].astype(str).str.zfill(11)
+    out_df['sector_name'] = out_df['sector_name'].astype(str)
     Path('data').mkdir(exist_ok=True)
-    la_df[output_cols].to_parquet('data/lodes_blocks_la.parquet')
+    out_df.to_parquet('data/lodes_blocks_la.parquet')
     print("\n✅ Processed data saved to: data/lodes_blocks_la.parquet")
     
     print("\n" + "=" * 60)
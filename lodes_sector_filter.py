@@ -6,8 +6,15 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import json
+import base64
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import orjson
+except ImportError:
+    orjson = None
 import ssl
+from lodes_common import load_tract_centroids, read_la_blocks
 ssl._create_default_https_context = ssl._create_unverified_context
 warnings.filterwarnings('ignore')
 
@@ -35,38 +42,88 @@ SECTORS = {
     'CNS20': ('92', 'Public Admin', '#7f8c8d'),
 }
 
+# Map center; point coordinates are shipped as fixed-point offsets from it
+MAP_CENTER = (34.05, -118.25)
+COORD_SCALE = 1e5
+
+def json_bytes(obj):
+    """Serialize to UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=lambda o: o.tolist()).encode()
+
+
+def pack_float32(arr):
+    """Pack an array as base64 little-endian float32 for a JS Float32Array."""
+    return base64.b64encode(np.ascontiguousarray(arr, dtype='<f4').tobytes()).decode()
+
+
+def pack_coords(lat, lon):
+    """Pack lat/lon as base64 int24 offsets (1e-5 deg) from MAP_CENTER.
+    
+    Three little-endian bytes per axis, so 6 bytes per point instead of 8.
+    """
+    offsets = np.column_stack([lat, lon]).astype(np.float64) - MAP_CENTER
+    q = np.round(offsets * COORD_SCALE).astype('<i4')
+    return base64.b64encode(q.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()).decode()
+
+
+def minify_template(text):
+    """Strip indentation, blank lines and whole-line // comments from the page template.
+    
+    Line breaks are kept so the JS never depends on inserted semicolons.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+
+def top_n_index(values, n):
+    """Positions of the n largest values, largest first (ties by position).
+    
+    Same selection and order as Series.nlargest(keep='first'), but found with
+    an O(N) partition instead of a sort of the whole column.
+    """
+    kth = np.partition(values, len(values) - n)[len(values) - n]
+    above = np.flatnonzero(values > kth)
+    ties = np.flatnonzero(values == kth)[:n - len(above)]
+    idx = np.sort(np.concatenate([above, ties]))
+    return idx[np.argsort(-values[idx], kind='stable')]
+
+
 def load_data():
     """Load and prepare LODES data."""
     print("Loading LODES data...")
-    df = pd.read_parquet('data/lodes_wac_blocks_ca_2021.parquet')
-    
-    # Filter to LA County
-    df['w_geocode'] = df['w_geocode'].astype(str).str.zfill(15)
-    df['county'] = df['w_geocode'].str[2:5]
-    df = df[df['county'] == '037'].copy()
+    # Only the geocode and job counts, and only LA County row groups
+    df = read_la_blocks(columns=['w_geocode', 'C000'] + list(SECTORS))
     print(f"LA County blocks: {len(df):,}")
     
-    # Get tract for coordinates
-    df['tract'] = df['w_geocode'].str[:11]
+    # Get tract for coordinates (leading 11 digits)
+    df['tract'] = df['w_geocode'].to_numpy(np.int64) // 10**4
     
     # Load tract centroids
     print("Loading tract centroids...")
-    centroids = pd.read_csv("https://www2.census.gov/geo/docs/reference/cenpop2020/tract/CenPop2020_Mean_TR06.txt")
-    centroids['STATEFP'] = centroids['STATEFP'].astype(str).str.zfill(2)
-    centroids['COUNTYFP'] = centroids['COUNTYFP'].astype(str).str.zfill(3)
-    centroids['TRACTCE'] = centroids['TRACTCE'].astype(str).str.zfill(6)
-    centroids['tract'] = centroids['STATEFP'] + centroids['COUNTYFP'] + centroids['TRACTCE']
-    centroids = centroids[centroids['COUNTYFP'] == '037'][['tract', 'LATITUDE', 'LONGITUDE']]
+    centroids = load_tract_centroids()
+    centroids['tract'] = (centroids['STATEFP'].astype(np.int64) * 10**9
+                          + centroids['COUNTYFP'].astype(np.int64) * 10**6
+                          + centroids['TRACTCE'].astype(np.int64))
+    centroids = centroids[centroids['COUNTYFP'] == 37][['tract', 'LATITUDE', 'LONGITUDE']]
     
-    df = df.merge(centroids, on='tract', how='left')
+    # Gather each block's tract centroid by position (-1 = no centroid)
+    idx = pd.Index(centroids['tract']).get_indexer(df['tract'])
+    found = idx >= 0
+    lat = np.where(found, centroids['LATITUDE'].to_numpy()[idx], np.nan)
+    lon = np.where(found, centroids['LONGITUDE'].to_numpy()[idx], np.nan)
     
-    # Jitter for block-level visualization
-    np.random.seed(42)
-    df['lat'] = df['LATITUDE'] + np.random.uniform(-0.002, 0.002, len(df))
-    df['lon'] = df['LONGITUDE'] + np.random.uniform(-0.002, 0.002, len(df))
+    # Jitter for block-level visualization; float32 is plenty for display
+    rng = np.random.default_rng(42)
+    jitter = rng.uniform(-0.002, 0.002, (len(df), 2)).astype(np.float32)
+    df[['lat', 'lon']] = np.column_stack([lat, lon]).astype(np.float32) + jitter
     
     # Filter to blocks with jobs and coordinates
     df = df[(df['C000'] > 0) & df['lat'].notna()].copy()
+    
+    # Map display doesn't need int64 counts
+    df[list(SECTORS)] = df[list(SECTORS)].astype(np.int32)
     print(f"Blocks with jobs: {len(df):,}")
     
     return df
@@ -75,24 +132,68 @@ def load_data():
 def create_interactive_map(df, output_path='output/lodes_sector_filter.html'):
     """Create interactive HTML map with sector dropdown."""
     
-    # Prepare data for each sector
-    sector_data = {}
-    for cns_code, (naics, name, color) in SECTORS.items():
-        if cns_code in df.columns:
-            sector_df = df[df[cns_code] > 0][['lat', 'lon', cns_code, 'w_geocode']].copy()
-            sector_df = sector_df.rename(columns={cns_code: 'jobs'})
-            # Sample if too large
-            if len(sector_df) > 15000:
-                sector_df = sector_df.nlargest(15000, 'jobs')
-            sector_data[name] = {
-                'color': color,
-                'data': sector_df[['lat', 'lon', 'jobs']].values.tolist(),
-                'total_jobs': int(df[cns_code].sum()),
-                'block_count': int((df[cns_code] > 0).sum())
-            }
+    # Prepare data for each sector from one long-form pass over the
+    # (blocks x sectors) counts instead of 20 separate mask-and-copy scans
+    cns_cols = [cns for cns in SECTORS if cns in df.columns]
+    long = df.melt(id_vars=['lat', 'lon'], value_vars=cns_cols,
+                   var_name='cns', value_name='jobs')
+    # 20 repeated labels: store as category codes for a cheaper groupby
+    long['cns'] = long['cns'].astype(pd.CategoricalDtype(cns_cols))
+    long = long[long['jobs'] > 0]
+    groups = dict(tuple(long.groupby('cns', sort=False, observed=True)))
+    
+    def process_sector(cns_code):
+        naics, name, color = SECTORS[cns_code]
+        sector_df = groups.get(cns_code, long.iloc[:0])
+        total_jobs = int(sector_df['jobs'].sum())
+        block_count = len(sector_df)
+        # Sample if too large
+        if block_count > 15000:
+            sector_df = sector_df.iloc[top_n_index(sector_df['jobs'].to_numpy(), 15000)]
+        jobs = sector_df['jobs'].to_numpy()
+        radius = np.maximum(3, np.sqrt(jobs, dtype=np.float32) * 1.5)
+        return name, {
+            'color': color,
+            'coords_b64': pack_coords(sector_df['lat'].to_numpy(), sector_df['lon'].to_numpy()),
+            'data_b64': pack_float32(np.column_stack([radius, jobs])),
+            'n': len(sector_df),
+            'total_jobs': total_jobs,
+            'block_count': block_count
+        }
+    
+    # The sectors are independent and the NumPy work releases the GIL;
+    # map() keeps them in SECTORS order for the dropdown
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        sector_data = dict(pool.map(process_sector, cns_cols))
     
-    # Generate HTML
-    html = f'''<!DOCTYPE html>
+    # Dominant sector per block for the "ALL" view, sampled here once
+    # instead of shuffled in the browser on every page load
+    cns_jobs = df[list(SECTORS)].to_numpy(np.int32)
+    dominant = cns_jobs.argmax(axis=1)
+    dominant_jobs = cns_jobs.max(axis=1)
+    keep = np.flatnonzero(dominant_jobs > 0)
+    if len(keep) > 20000:
+        keep = np.sort(np.random.default_rng(42).choice(keep, 20000, replace=False))
+    all_jobs = dominant_jobs[keep]
+    all_points = {
+        'names': [name for _, name, _ in SECTORS.values()],
+        'colors': [color for _, _, color in SECTORS.values()],
+        'coords_b64': pack_coords(df['lat'].to_numpy()[keep], df['lon'].to_numpy()[keep]),
+        'data_b64': pack_float32(np.column_stack([
+            np.maximum(2, np.sqrt(all_jobs, dtype=np.float32) * 1.2), all_jobs, dominant[keep],
+        ])),
+        'n': len(keep),
+    }
+    
+    options_html = "".join(f'<option value="{name}">{name}</option>' for name in sector_data.keys())
+    legend_html = "".join(f'''<div class="legend-item" onclick="selectSector('{name}')">
+            <span class="legend-color" style="background:{info['color']}"></span>
+            {name}
+        </div>''' for name, info in sector_data.items())
+    
+    # Generate HTML around the data payloads, which are streamed to the file
+    # separately rather than interpolated into one large string
+    head = f'''<!DOCTYPE html>
 <html>
 <head>
     <title>LA LODES Employment Map by NAICS Sector</title>
@@ -193,7 +294,7 @@ def create_interactive_map(df, output_path='output/lodes_sector_filter.html'):
         <div class="controls">
             <select id="sectorSelect" onchange="changeSector()">
                 <option value="ALL">All Sectors (Dominant)</option>
-                {"".join(f'<option value="{name}">{name}</option>' for name in sector_data.keys())}
+                {options_html}
             </select>
             <div class="stats" id="stats">Select a sector</div>
         </div>
@@ -211,18 +312,18 @@ def create_interactive_map(df, output_path='output/lodes_sector_filter.html'):
     
     <div class="legend" id="legend">
         <strong>NAICS Sectors</strong>
-        {"".join(f'''<div class="legend-item" onclick="selectSector('{name}')">
-            <span class="legend-color" style="background:{info['color']}"></span>
-            {name}
-        </div>''' for name, info in sector_data.items())}
+        {legend_html}
     </div>
 
     <script>
         // Sector data
-        const sectorData = {json.dumps(sector_data)};
-        
-        // Initialize map
-        const map = L.map('map').setView([34.05, -118.25], 10);
+'''
+    tail = f'''        
+        // Initialize map; circles draw into one shared canvas instead of an SVG node each
+        const map = L.map('map', {{
+            preferCanvas: true,
+            renderer: L.canvas({{ padding: 0.5 }})
+        }}).setView([{MAP_CENTER[0]}, {MAP_CENTER[1]}], 10);
         
         L.tileLayer('https://{{s}}.basemaps.cartocdn.com/dark_all/{{z}}/{{x}}/{{y}}{{r}}.png', {{
             attribution: '&copy; OpenStreetMap, &copy; CARTO',
@@ -231,6 +332,24 @@ def create_interactive_map(df, output_path='output/lodes_sector_filter.html'):
         
         let currentLayer = null;
         
+        // Points are shipped as base64 float32 with a fixed stride
+        function decodeFloat32(b64) {{
+            const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+            return new Float32Array(bytes.buffer);
+        }}
+        
+        // Coordinates are int24 offsets from the map center, lat/lon interleaved
+        function decodeCoords(b64) {{
+            const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+            const center = [{MAP_CENTER[0]}, {MAP_CENTER[1]}];
+            const coords = new Float64Array(bytes.length / 3);
+            for (let i = 0, j = 0; j < coords.length; i += 3, j++) {{
+                const q = (bytes[i] | (bytes[i + 1] << 8) | (bytes[i + 2] << 16)) << 8 >> 8;
+                coords[j] = center[j & 1] + q / {COORD_SCALE:g};
+            }}
+            return coords;
+        }}
+        
         function changeSector() {{
             const sector = document.getElementById('sectorSelect').value;
             
@@ -255,9 +374,12 @@ def create_interactive_map(df, output_path='output/lodes_sector_filter.html'):
             // Create layer group
             currentLayer = L.layerGroup();
             
-            data.data.forEach(point => {{
-                const [lat, lon, jobs] = point;
-                const radius = Math.max(3, Math.sqrt(jobs) * 1.5);
+            // [lat, lon] and [radius, jobs] per point
+            const coords = decodeCoords(data.coords_b64);
+            const pts = decodeFloat32(data.data_b64);
+            for (let i = 0; i < data.n; i++) {{
+                const lat = coords[2 * i], lon = coords[2 * i + 1];
+                const radius = pts[2 * i], jobs = pts[2 * i + 1];
                 
                 L.circleMarker([lat, lon], {{
                     radius: radius,
@@ -266,7 +388,7 @@ def create_interactive_map(df, output_path='output/lodes_sector_filter.html'):
                     weight: 0,
                     fillOpacity: 0.7
                 }}).bindPopup(`<strong>${{sector}}</strong><br>${{jobs}} jobs`).addTo(currentLayer);
-            }});
+            }}
             
             currentLayer.addTo(map);
         }}
@@ -274,32 +396,22 @@ def create_interactive_map(df, output_path='output/lodes_sector_filter.html'):
         function showAllSectors() {{
             currentLayer = L.layerGroup();
             
-            // For "ALL", show dominant sector per block (sample)
-            const allPoints = [];
-            for (const [sector, info] of Object.entries(sectorData)) {{
-                info.data.slice(0, 3000).forEach(point => {{
-                    allPoints.push({{
-                        lat: point[0],
-                        lon: point[1],
-                        jobs: point[2],
-                        sector: sector,
-                        color: info.color
-                    }});
-                }});
-            }}
-            
-            // Sample and show
-            allPoints.sort(() => Math.random() - 0.5);
-            allPoints.slice(0, 20000).forEach(p => {{
-                const radius = Math.max(2, Math.sqrt(p.jobs) * 1.2);
-                L.circleMarker([p.lat, p.lon], {{
+            // Pre-sampled [lat, lon] and [radius, jobs, sector index] for the dominant sector per block
+            const coords = decodeCoords(allPoints.coords_b64);
+            const pts = decodeFloat32(allPoints.data_b64);
+            for (let i = 0; i < allPoints.n; i++) {{
+                const lat = coords[2 * i], lon = coords[2 * i + 1];
+                const radius = pts[3 * i], jobs = pts[3 * i + 1], s = pts[3 * i + 2];
+                const sector = allPoints.names[s];
+                const color = allPoints.colors[s];
+                L.circleMarker([lat, lon], {{
                     radius: radius,
-                    fillColor: p.color,
-                    color: p.color,
+                    fillColor: color,
+                    color: color,
                     weight: 0,
                     fillOpacity: 0.6
-                }}).bindPopup(`<strong>${{p.sector}}</strong><br>${{p.jobs}} jobs`).addTo(currentLayer);
-            }});
+                }}).bindPopup(`<strong>${{sector}}</strong><br>${{jobs}} jobs`).addTo(currentLayer);
+            }}
             
             currentLayer.addTo(map);
         }}
@@ -316,8 +428,13 @@ def create_interactive_map(df, output_path='output/lodes_sector_filter.html'):
 </html>'''
     
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w') as f:
-        f.write(html)
+    with open(output_path, 'wb') as f:
+        f.write(minify_template(head).encode())
+        for var, payload in (('sectorData', sector_data), ('allPoints', all_points)):
+            f.write(f'const {var} = '.encode())
+            f.write(json_bytes(payload))
+            f.write(b';\n')
+        f.write(minify_template(tail).encode())
     
     print(f"✅ Interactive map saved to: {output_path}")
     return output_path
@@ -5,14 +5,30 @@ Toggle between geographic granularities with sector filtering
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import json
+import orjson
 import yaml
 import warnings
-import ssl
+import gzip
+import hashlib
+try:
+    import brotli
+except ImportError:
+    brotli = None
 import requests
-ssl._create_default_https_context = ssl._create_unverified_context
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from lodes_common import LODES_CACHE, aggregate_to_tracts, read_la_blocks, sum_by_key
 warnings.filterwarnings('ignore')
 
+# One verified session for all Census downloads: pooled connections, and
+# retries with backoff on transient server errors
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16, pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504]),
+))
+
 # NAICS sector mapping
 SECTORS = {
     'CNS01': ('11', 'Agriculture', '#27ae60'),
@@ -39,20 +55,56 @@ SECTORS = {
 
 CNS_COLS = [f'CNS{i:02d}' for i in range(1, 21)]
 
+# Per-sector LQ columns, built once for the feature loops
+LQ_COLS = [f'{cns}_lq' for cns in CNS_COLS]
+
+# Properties for boundary features with no jobs data
+NO_DATA_PROPS = {'total_jobs': 0, 'dominant_sector': 'None', 'sector_color': '#333', 'concentration': 0}
+
+# Sector name/color by dominant_cns category code, for vectorized lookups
+SECTOR_NAMES = np.array([SECTORS[c][1] for c in CNS_COLS], dtype=object)
+SECTOR_COLORS = np.array([SECTORS[c][2] for c in CNS_COLS], dtype=object)
+
+# One LQ inside each sector-view color band: none, <0.5, <0.8, <1.2, <2, 2+
+LQ_BAND_SAMPLES = np.array([0, 0.25, 0.65, 1.0, 1.6, 2.0])
+
+# Boundary arc simplification tolerance, in degrees (~20 m)
+TOPO_SIMPLIFY = 0.0002
+
+# LODES block-to-ZCTA crosswalk cache
+CROSSWALK_PATH = Path('data/lodes_block_zcta_xwalk.parquet')
+
+# Where the block/tract/ZIP aggregates are cached between runs; bump the
+# format when the cached frames' columns or dtypes change
+LEVEL_AGG_DIR = Path('data')
+LEVEL_AGG_FORMAT = 2
+
+# Everything the boundary topologies and block points are built from, for
+# versioning their cache; bump the format when the layers' contents change
+LAYER_SOURCES = (LODES_CACHE, CROSSWALK_PATH, Path('data/la_tracts.geojson'), Path('data/la_zctas.geojson'),
+                 Path('data/la_block_centroids.parquet'), Path('data/submarkets_optimized_37.yaml'))
+LAYER_FORMAT = 2
+
+# ZCTAs per boundary query; keeps each IN (...) clause well within server limits
+ZCTA_QUERY_CHUNK = 200
+
+# Folder (next to the HTML) for the data files the page fetches
+DATA_DIR_NAME = 'unified_data'
+
 
 def load_lodes_data():
     """Load LODES block-level data for LA County."""
     print("Loading LODES data...")
-    df = pd.read_parquet('data/lodes_wac_blocks_ca_2021.parquet')
-    
-    # Filter to LA County
-    df['w_geocode'] = df['w_geocode'].astype(str).str.zfill(15)
-    df['county'] = df['w_geocode'].str[2:5]
-    df = df[df['county'] == '037'].copy()
+    # Only the needed columns, and only LA County row groups
+    df = read_la_blocks(columns=['w_geocode', 'C000'] + CNS_COLS)
+    # Job counts fit comfortably in int32
+    df[['C000'] + CNS_COLS] = df[['C000'] + CNS_COLS].astype(np.int32)
     
-    # Extract geographic levels
-    df['tract'] = df['w_geocode'].str[:11]
-    df['block'] = df['w_geocode'].str[:15]
+    # Geographic levels as integer keys: a block is the full 15-digit
+    # geocode, its tract the leading 11 digits
+    df['w_geocode'] = df['w_geocode'].astype(np.int64)
+    df['tract'] = df['w_geocode'] // 10**4
+    df['block'] = df['w_geocode']
     
     print(f"LA County blocks: {len(df):,}")
     return df
@@ -60,7 +112,7 @@ def load_lodes_data():
 
 def download_zcta_crosswalk():
     """Download LODES official block-to-ZCTA crosswalk."""
-    crosswalk_path = Path('data/lodes_block_zcta_xwalk.parquet')
+    crosswalk_path = CROSSWALK_PATH
     
     if crosswalk_path.exists():
         print("Loading cached LODES block-ZCTA crosswalk...")
@@ -72,12 +124,27 @@ def download_zcta_crosswalk():
     url = 'https://lehd.ces.census.gov/data/lodes/LODES8/ca/ca_xwalk.csv.gz'
     
     try:
-        xwalk = pd.read_csv(url, compression='gzip', dtype=str, 
-                           usecols=['tabblk2020', 'zcta', 'cty'])
+        from pyarrow import csv
+        import pyarrow.compute as pc
+        
+        # Gunzip and parse as the response streams in, with Arrow's
+        # multithreaded CSV reader; all needed columns stay strings
+        response = SESSION.get(url, timeout=120, stream=True)
+        response.raise_for_status()
+        columns = ['tabblk2020', 'zcta', 'cty']
+        table = csv.read_csv(
+            gzip.GzipFile(fileobj=response.raw),
+            read_options=csv.ReadOptions(use_threads=True),
+            convert_options=csv.ConvertOptions(
+                include_columns=columns,
+                column_types={col: 'string' for col in columns},
+                strings_can_be_null=True,
+            ),
+        )
         
         # Filter to LA County (06037)
-        xwalk = xwalk[xwalk['cty'] == '06037'].copy()
-        xwalk = xwalk[['tabblk2020', 'zcta']].dropna()
+        table = table.filter(pc.equal(table['cty'], '06037'))
+        xwalk = table.select(['tabblk2020', 'zcta']).drop_null().to_pandas()
         
         xwalk.to_parquet(crosswalk_path)
         print(f"Cached {len(xwalk):,} block-ZCTA mappings ({xwalk['zcta'].nunique()} ZCTAs)")
@@ -87,6 +154,39 @@ def download_zcta_crosswalk():
         return None
 
 
+def add_dominant_sector(level_df):
+    """Add the dominant CNS code and its job count from one argmax over the sector columns."""
+    cns_block = level_df[CNS_COLS].to_numpy()
+    codes = cns_block.argmax(axis=1)
+    # 20 possible codes, so store them as a categorical
+    level_df['dominant_cns'] = pd.Categorical.from_codes(codes, categories=CNS_COLS)
+    level_df['dominant_jobs'] = np.take_along_axis(cns_block, codes[:, None], axis=1)[:, 0]
+    return level_df
+
+
+def add_sector_metrics(level_df):
+    """Add dominant sector, concentration, and per-sector share/LQ columns in place."""
+    cns = level_df[CNS_COLS]
+    total = level_df['total_jobs']
+    
+    add_dominant_sector(level_df)
+    level_df['concentration'] = level_df['dominant_jobs'] / total
+    
+    # Location quotient: each area's sector share over the share across all
+    # areas, as one broadcast divide over the (areas x sectors) block
+    cns_block = cns.to_numpy(np.float64)
+    totals = total.to_numpy(np.float64)[:, None]
+    county_share = cns_block.sum(axis=0) / totals.sum()
+    share = np.divide(cns_block, totals, out=np.full_like(cns_block, np.nan), where=totals > 0)
+    lq = np.divide(share, county_share, out=np.zeros_like(share), where=county_share > 0)
+    level_df[[f'{c}_share' for c in CNS_COLS] + [f'{c}_lq' for c in CNS_COLS]] = np.hstack([share, lq]).astype(np.float32)
+    
+    codes = level_df['dominant_cns'].cat.codes.to_numpy()
+    level_df['dominant_sector'] = SECTOR_NAMES[codes]
+    level_df['sector_color'] = SECTOR_COLORS[codes]
+    return level_df
+
+
 def aggregate_to_levels(df):
     """Aggregate data to block, tract, and ZIP levels."""
     agg_cols = ['C000'] + CNS_COLS
@@ -97,8 +197,7 @@ def aggregate_to_levels(df):
     block_df = block_df.rename(columns={'C000': 'total_jobs'})
     
     # Add dominant sector
-    block_df['dominant_cns'] = block_df[CNS_COLS].idxmax(axis=1)
-    block_df['dominant_jobs'] = block_df[CNS_COLS].max(axis=1)
+    add_dominant_sector(block_df)
     
     # Get centroids (approximate from geocode)
     # Block geocode: SSCCCTTTTTTBBBB (15 digits)
@@ -108,27 +207,10 @@ def aggregate_to_levels(df):
     
     # --- TRACT LEVEL ---
     print("Processing tract level...")
-    tract_df = df.groupby('tract')[agg_cols].sum().reset_index()
-    tract_df.columns = ['tract', 'total_jobs'] + CNS_COLS
+    tract_df = aggregate_to_tracts(df)
     
     # Calculate dominant sector and LQ
-    tract_df['dominant_cns'] = tract_df[CNS_COLS].idxmax(axis=1)
-    tract_df['dominant_jobs'] = tract_df[CNS_COLS].max(axis=1)
-    tract_df['concentration'] = tract_df['dominant_jobs'] / tract_df['total_jobs']
-    
-    # Location quotient
-    county_totals = tract_df[['total_jobs'] + CNS_COLS].sum()
-    for cns in CNS_COLS:
-        county_share = county_totals[cns] / county_totals['total_jobs']
-        tract_df[f'{cns}_share'] = tract_df[cns] / tract_df['total_jobs'].replace(0, np.nan)
-        tract_df[f'{cns}_lq'] = tract_df[f'{cns}_share'] / county_share
-    
-    tract_df['dominant_sector'] = tract_df['dominant_cns'].map(
-        lambda x: SECTORS.get(x, ('XX', 'Unknown', '#888'))[1]
-    )
-    tract_df['sector_color'] = tract_df['dominant_cns'].map(
-        lambda x: SECTORS.get(x, ('XX', 'Unknown', '#888'))[2]
-    )
+    add_sector_metrics(tract_df)
     
     print(f"  Tracts: {len(tract_df):,}")
     
@@ -137,34 +219,22 @@ def aggregate_to_levels(df):
     xwalk = download_zcta_crosswalk()
     
     if xwalk is not None:
-        # Merge block data with ZCTA crosswalk
-        df['tabblk2020'] = df['w_geocode']
-        zip_merged = df.merge(xwalk, on='tabblk2020', how='inner')
+        # Look up each block's ZCTA in the crosswalk index instead of
+        # merging the whole block frame against it
+        zcta_by_block = pd.Series(xwalk['zcta'].to_numpy(), index=xwalk['tabblk2020'].astype(np.int64))
+        block_zcta = df['w_geocode'].map(zcta_by_block)
+        matched = block_zcta.notna()
         
-        print(f"  Blocks matched to ZCTA: {len(zip_merged):,}")
+        print(f"  Blocks matched to ZCTA: {matched.sum():,}")
         
         # Aggregate to ZIP level
-        zip_df = zip_merged.groupby('zcta')[agg_cols].sum().reset_index()
-        zip_df.columns = ['zip', 'total_jobs'] + CNS_COLS
+        zips, sums = sum_by_key(block_zcta[matched].to_numpy(str), df.loc[matched, agg_cols].to_numpy())
+        zip_df = pd.DataFrame(sums, columns=['total_jobs'] + CNS_COLS)
+        zip_df.insert(0, 'zip', zips.astype(object))
         zip_df = zip_df[zip_df['total_jobs'] > 0].copy()
         
         # Calculate dominant sector and LQ for ZIPs
-        zip_df['dominant_cns'] = zip_df[CNS_COLS].idxmax(axis=1)
-        zip_df['dominant_jobs'] = zip_df[CNS_COLS].max(axis=1)
-        zip_df['concentration'] = zip_df['dominant_jobs'] / zip_df['total_jobs']
-        
-        county_totals = zip_df[['total_jobs'] + CNS_COLS].sum()
-        for cns in CNS_COLS:
-            county_share = county_totals[cns] / county_totals['total_jobs'] if county_totals['total_jobs'] > 0 else 0
-            zip_df[f'{cns}_share'] = zip_df[cns] / zip_df['total_jobs'].replace(0, np.nan)
-            zip_df[f'{cns}_lq'] = zip_df[f'{cns}_share'] / county_share if county_share > 0 else 0
-        
-        zip_df['dominant_sector'] = zip_df['dominant_cns'].map(
-            lambda x: SECTORS.get(x, ('XX', 'Unknown', '#888'))[1]
-        )
-        zip_df['sector_color'] = zip_df['dominant_cns'].map(
-            lambda x: SECTORS.get(x, ('XX', 'Unknown', '#888'))[2]
-        )
+        add_sector_metrics(zip_df)
         
         print(f"  ZIP codes with jobs: {len(zip_df):,}")
     else:
@@ -177,6 +247,50 @@ def aggregate_to_levels(df):
     return block_df, tract_df, zip_df, submarket_df
 
 
+def cache_key(sources, *extra):
+    """Short hash of the source files' paths, mtimes and sizes, plus any extra settings."""
+    stamps = [str(value) for value in extra]
+    for source in sources:
+        if source.exists():
+            stat = source.stat()
+            stamps.append(f'{source}:{stat.st_mtime_ns}:{stat.st_size}')
+        else:
+            stamps.append(f'{source}:missing')
+    return hashlib.md5('|'.join(stamps).encode()).hexdigest()[:8]
+
+
+def level_agg_paths():
+    """Block/tract/ZIP aggregate cache paths, versioned on the LODES parquet and crosswalk."""
+    key = cache_key((LODES_CACHE, CROSSWALK_PATH), f'format:{LEVEL_AGG_FORMAT}')
+    return {level: LEVEL_AGG_DIR / f'unified_{level}_agg_v{key}.parquet'
+            for level in ('block', 'tract', 'zip')}
+
+
+def load_levels():
+    """Block, tract, ZIP and submarket frames, reusing cached aggregates when the inputs are unchanged."""
+    paths = level_agg_paths()
+    if all(path.exists() for path in paths.values()):
+        print("Using cached block/tract/ZIP aggregates...")
+        block_df, tract_df, zip_df = (pd.read_parquet(path) for path in paths.values())
+        print("Processing submarket level...")
+        return block_df, tract_df, zip_df, aggregate_to_submarkets(zip_df)
+    
+    block_df, tract_df, zip_df, submarket_df = aggregate_to_levels(load_lodes_data())
+    
+    # Only cache complete results, so a failed crosswalk download is retried
+    if len(zip_df) > 0:
+        # Re-key, since aggregating may have just downloaded the crosswalk
+        paths = level_agg_paths()
+        for stale in LEVEL_AGG_DIR.glob('unified_*_agg_v*.parquet'):
+            stale.unlink()
+        LEVEL_AGG_DIR.mkdir(parents=True, exist_ok=True)
+        for level_df, path in zip((block_df, tract_df, zip_df), paths.values()):
+            level_df.to_parquet(path, index=False)
+        print(f"Cached block/tract/ZIP aggregates to: {LEVEL_AGG_DIR}")
+    
+    return block_df, tract_df, zip_df, submarket_df
+
+
 def load_submarket_config():
     """Load the 37-submarket configuration."""
     config_path = Path('data/submarkets_optimized_37.yaml')
@@ -220,22 +334,7 @@ def aggregate_to_submarkets(zip_df):
     submarket_df = zip_with_submarket.groupby('submarket')[agg_cols].sum().reset_index()
     
     # Calculate dominant sector and LQ
-    submarket_df['dominant_cns'] = submarket_df[CNS_COLS].idxmax(axis=1)
-    submarket_df['dominant_jobs'] = submarket_df[CNS_COLS].max(axis=1)
-    submarket_df['concentration'] = submarket_df['dominant_jobs'] / submarket_df['total_jobs']
-    
-    county_totals = submarket_df[['total_jobs'] + CNS_COLS].sum()
-    for cns in CNS_COLS:
-        county_share = county_totals[cns] / county_totals['total_jobs'] if county_totals['total_jobs'] > 0 else 0
-        submarket_df[f'{cns}_share'] = submarket_df[cns] / submarket_df['total_jobs'].replace(0, np.nan)
-        submarket_df[f'{cns}_lq'] = submarket_df[f'{cns}_share'] / county_share if county_share > 0 else 0
-    
-    submarket_df['dominant_sector'] = submarket_df['dominant_cns'].map(
-        lambda x: SECTORS.get(x, ('XX', 'Unknown', '#888'))[1]
-    )
-    submarket_df['sector_color'] = submarket_df['dominant_cns'].map(
-        lambda x: SECTORS.get(x, ('XX', 'Unknown', '#888'))[2]
-    )
+    add_sector_metrics(submarket_df)
     
     # Add ZIP codes list for each submarket (for boundary merging)
     submarket_zips = zip_with_submarket.groupby('submarket')['zip'].apply(list).to_dict()
@@ -251,8 +350,7 @@ def download_tract_boundaries():
     
     if cache_path.exists():
         print("Loading cached tract boundaries...")
-        with open(cache_path) as f:
-            return json.load(f)
+        return orjson.loads(cache_path.read_bytes())
     
     print("Downloading tract boundaries...")
     url = "https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/Tracts_Blocks/MapServer/8/query"
@@ -264,15 +362,14 @@ def download_tract_boundaries():
         'outSR': '4326'
     }
     
-    response = requests.get(url, params=params)
+    response = SESSION.get(url, params=params)
     if response.status_code == 200:
-        geojson = response.json()
+        geojson = orjson.loads(response.content)
         print(f"Downloaded {len(geojson['features'])} tract boundaries")
         
-        # Cache it
+        # Cache the response bytes as-is; no need to re-serialize
         cache_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(cache_path, 'w') as f:
-            json.dump(geojson, f)
+        cache_path.write_bytes(response.content)
         
         return geojson
     else:
@@ -280,44 +377,49 @@ def download_tract_boundaries():
         return None
 
 
-def download_zcta_boundaries():
-    """Download ZCTA boundaries for LA area."""
+def download_zcta_boundaries(zctas):
+    """Download boundaries for the given LA area ZCTAs."""
     cache_path = Path('data/la_zctas.geojson')
     
-    # Force re-download to get all LA County ZCTAs
     if cache_path.exists():
         print("Loading cached ZCTA boundaries...")
-        with open(cache_path) as f:
-            return json.load(f)
+        return orjson.loads(cache_path.read_bytes())
     
     print("Downloading ZCTA boundaries...")
     
     # Census TIGER API for ZCTAs
     url = "https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/PUMA_TAD_TAZ_UGA_ZCTA/MapServer/4/query"
     
-    # LA County ZCTAs include: 900-918, 923, 932, 935 (high desert areas like Lancaster/Palmdale)
+    # Ask for exactly the ZCTAs we need, in IN-list chunks small enough for
+    # the server, instead of every ZCTA under each LA ZIP prefix
+    zctas = sorted(zctas)
+    chunks = [zctas[i:i + ZCTA_QUERY_CHUNK] for i in range(0, len(zctas), ZCTA_QUERY_CHUNK)]
     all_features = []
     
-    prefixes = ['900', '901', '902', '903', '904', '905', '906', '907', '908', '909', 
-                '910', '911', '912', '913', '914', '915', '916', '917', '918',
-                '923', '932', '935']  # Added high desert prefixes
-    
-    for prefix in prefixes:
+    def fetch(chunk):
+        in_list = ','.join(f"'{z}'" for z in chunk)
         params = {
-            'where': f"ZCTA5 LIKE '{prefix}%'",
+            'where': f"ZCTA5 IN ({in_list})",
             'outFields': 'ZCTA5,GEOID',
             'f': 'geojson',
             'outSR': '4326'
         }
         
         try:
-            response = requests.get(url, params=params, timeout=30)
+            # POST keeps the long where clause out of the URL
+            response = SESSION.post(url, data=params, timeout=60)
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 if 'features' in data:
-                    all_features.extend(data['features'])
+                    return data['features']
         except Exception as e:
-            print(f"  Warning: Failed to get ZCTAs for {prefix}*: {e}")
+            print(f"  Warning: Failed to get ZCTAs {chunk[0]}-{chunk[-1]}: {e}")
+        return []
+    
+    # map() keeps the features in ZCTA order
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for features in pool.map(fetch, chunks):
+            all_features.extend(features)
     
     if all_features:
         geojson = {'type': 'FeatureCollection', 'features': all_features}
@@ -325,8 +427,7 @@ def download_zcta_boundaries():
         
         # Cache it
         cache_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(cache_path, 'w') as f:
-            json.dump(geojson, f)
+        cache_path.write_bytes(orjson.dumps(geojson))
         
         return geojson
     else:
@@ -340,7 +441,8 @@ def download_block_centroids(block_df):
     
     if cache_path.exists():
         print("Loading cached block centroids...")
-        return pd.read_parquet(cache_path)
+        # Older caches stored block geocodes as strings
+        return pd.read_parquet(cache_path).astype({'block': np.int64})
     
     print("Downloading block centroids...")
     
@@ -352,41 +454,33 @@ def download_block_centroids(block_df):
     tract_geojson = download_tract_boundaries()
     
     if tract_geojson:
-        tract_centroids = {}
-        for feature in tract_geojson['features']:
-            geoid = feature['properties']['GEOID']
-            tract_id = geoid[:11] if len(geoid) > 11 else geoid
-            
-            # Calculate centroid from polygon
-            coords = feature['geometry']['coordinates']
-            if feature['geometry']['type'] == 'Polygon':
-                coords = coords[0]
-            elif feature['geometry']['type'] == 'MultiPolygon':
-                # Use largest polygon
-                coords = max(coords, key=lambda x: len(x[0]))[0]
-            
-            if coords:
-                lons = [c[0] for c in coords]
-                lats = [c[1] for c in coords]
-                tract_centroids[tract_id] = (np.mean(lons), np.mean(lats))
+        import shapely
+        from shapely.geometry import shape
+        
+        # Polygon centroids in one GEOS call over all features
+        features = tract_geojson['features']
+        centers = shapely.centroid(np.array([shape(f['geometry']) for f in features]))
+        centroid_lookup = pd.DataFrame(
+            {'lon': shapely.get_x(centers), 'lat': shapely.get_y(centers)},
+            index=[int(f['properties']['GEOID'][:11]) for f in features],
+        )
+        # Features are block groups; keep one centroid per tract (the last, as before)
+        centroid_lookup = centroid_lookup[~centroid_lookup.index.duplicated(keep='last')].dropna()
         
         # Assign block centroids based on tract with small jitter
-        centroids = []
-        for _, row in block_df.iterrows():
-            tract = row['tract']
-            if tract in tract_centroids:
-                lon, lat = tract_centroids[tract]
-                # Add small random jitter within tract
-                np.random.seed(hash(row['block']) % 2**32)
-                jitter_lon = np.random.uniform(-0.005, 0.005)
-                jitter_lat = np.random.uniform(-0.005, 0.005)
-                centroids.append({
-                    'block': row['block'],
-                    'lon': lon + jitter_lon,
-                    'lat': lat + jitter_lat
-                })
-        
-        centroid_df = pd.DataFrame(centroids)
+        tract_lon = block_df['tract'].map(centroid_lookup['lon']).to_numpy(np.float64)
+        tract_lat = block_df['tract'].map(centroid_lookup['lat']).to_numpy(np.float64)
+        found = ~np.isnan(tract_lon)
+        
+        # One jitter draw for all blocks instead of reseeding per block
+        rng = np.random.default_rng(42)
+        jitter = rng.uniform(-0.005, 0.005, size=(len(block_df), 2))
+        
+        centroid_df = pd.DataFrame({
+            'block': block_df['block'].to_numpy()[found],
+            'lon': tract_lon[found] + jitter[found, 0],
+            'lat': tract_lat[found] + jitter[found, 1],
+        })
         centroid_df.to_parquet(cache_path)
         print(f"Calculated {len(centroid_df):,} block centroids")
         return centroid_df
@@ -394,43 +488,52 @@ def download_block_centroids(block_df):
     return None
 
 
+def feature_properties(level_df, key):
+    """Map each area key to its feature properties, built column-wise from the level frame."""
+    concentration = [round(c * 100, 1) for c in level_df['concentration'].tolist()]
+    # Per-sector jobs and LQ as arrays in CNS order (see sectorIndex). Areas with
+    # no jobs have NaN LQs, which would serialize as null; the page reads them as 0.
+    lq_values = np.nan_to_num(level_df[LQ_COLS].to_numpy(np.float64))
+    cns_lq = [[round(v, 2) for v in row] for row in lq_values.tolist()]
+    props = [
+        {'total_jobs': total, 'dominant_sector': name, 'sector_color': color,
+         'concentration': conc, 'cns_jobs': jobs, 'cns_lq': lq}
+        for total, name, color, conc, jobs, lq in zip(
+            level_df['total_jobs'].tolist(), level_df['dominant_sector'].tolist(),
+            level_df['sector_color'].tolist(), concentration,
+            level_df[CNS_COLS].to_numpy().tolist(), cns_lq,
+        )
+    ]
+    return dict(zip(level_df[key].tolist(), props))
+
+
 def merge_data_with_boundaries(tract_df, zip_df, submarket_df, block_df):
     """Merge aggregated data with geographic boundaries."""
     
     # --- TRACT GEOJSON ---
     tract_geojson = download_tract_boundaries()
-    tract_lookup = tract_df.set_index('tract').to_dict('index')
+    tract_props = feature_properties(tract_df, 'tract')
     
+    # Properties are precomputed per tract, so each feature is one dict update
     for feature in tract_geojson['features']:
-        geoid = feature['properties']['GEOID']
-        tract_id = geoid[:11] if len(geoid) > 11 else geoid
-        
-        if tract_id in tract_lookup:
-            data = tract_lookup[tract_id]
-            feature['properties']['total_jobs'] = int(data['total_jobs'])
-            feature['properties']['dominant_sector'] = data['dominant_sector']
-            feature['properties']['sector_color'] = data['sector_color']
-            feature['properties']['concentration'] = round(data['concentration'] * 100, 1)
-            
-            for cns, (naics, name, color) in SECTORS.items():
-                if cns in data:
-                    feature['properties'][f'{name}_jobs'] = int(data[cns])
-                    feature['properties'][f'{name}_lq'] = round(data.get(f'{cns}_lq', 0), 2)
-        else:
-            feature['properties']['total_jobs'] = 0
-            feature['properties']['dominant_sector'] = 'None'
-            feature['properties']['sector_color'] = '#333'
-            feature['properties']['concentration'] = 0
+        tract_id = int(feature['properties']['GEOID'][:11])
+        feature['properties'].update(tract_props.get(tract_id, NO_DATA_PROPS))
     
     # --- ZIP GEOJSON (use pre-aggregated zip_df from LODES crosswalk) ---
-    zip_geojson = download_zcta_boundaries()
-    
     # Build ZIP to submarket mapping for later use
     _, zip_to_submarket = load_submarket_config()
     
+    # Boundaries for every LA County ZCTA in the crosswalk, plus any
+    # submarket ZIPs, so submarkets dissolve from complete ZIP sets
+    needed_zctas = set(zip_to_submarket) | set(zip_df['zip'] if len(zip_df) else [])
+    xwalk = download_zcta_crosswalk()
+    if xwalk is not None:
+        needed_zctas.update(xwalk['zcta'].unique())
+    zip_geojson = download_zcta_boundaries(needed_zctas)
+    
     if zip_geojson and len(zip_df) > 0:
         print("Merging pre-aggregated ZIP data with boundaries...")
-        zip_lookup = zip_df.set_index('zip').to_dict('index')
+        zip_props = feature_properties(zip_df, 'zip')
         
         matched_count = 0
         for feature in zip_geojson['features']:
@@ -438,22 +541,9 @@ def merge_data_with_boundaries(tract_df, zip_df, submarket_df, block_df):
             feature['properties']['zip'] = zcta
             feature['properties']['submarket'] = zip_to_submarket.get(zcta, '')
             
-            if zcta in zip_lookup:
-                data = zip_lookup[zcta]
-                feature['properties']['total_jobs'] = int(data['total_jobs'])
-                feature['properties']['dominant_sector'] = data['dominant_sector']
-                feature['properties']['sector_color'] = data['sector_color']
-                feature['properties']['concentration'] = round(data['concentration'] * 100, 1)
-                
-                for cns, (naics, name, color) in SECTORS.items():
-                    feature['properties'][f'{name}_jobs'] = int(data.get(cns, 0))
-                    feature['properties'][f'{name}_lq'] = round(data.get(f'{cns}_lq', 0), 2)
-                matched_count += 1
-            else:
-                feature['properties']['total_jobs'] = 0
-                feature['properties']['dominant_sector'] = 'None'
-                feature['properties']['sector_color'] = '#333'
-                feature['properties']['concentration'] = 0
+            props = zip_props.get(zcta)
+            feature['properties'].update(props or NO_DATA_PROPS)
+            matched_count += props is not None
         
         print(f"  ZCTAs matched: {matched_count}")
     elif zip_geojson:
@@ -468,23 +558,18 @@ def merge_data_with_boundaries(tract_df, zip_df, submarket_df, block_df):
     # --- BLOCK POINTS (simplified - no per-sector data to keep file size small) ---
     block_centroids = download_block_centroids(block_df)
     
-    block_points = []
+    # Only keep essential fields for blocks (no per-sector LQ - too heavy);
+    # kept as a frame so the top-N cut happens before the arrays are built
+    point_cols = ['lat', 'lon', 'total_jobs', 'dominant_cns', 'dominant_jobs']
     if block_centroids is not None:
-        block_with_coords = block_df.merge(block_centroids, on='block', how='inner')
-        
-        # Only keep essential fields for blocks (no per-sector LQ - too heavy)
-        for _, row in block_with_coords.iterrows():
-            sector_name = SECTORS.get(row['dominant_cns'], ('XX', 'Unknown', '#888'))[1]
-            sector_color = SECTORS.get(row['dominant_cns'], ('XX', 'Unknown', '#888'))[2]
-            
-            block_points.append({
-                'lat': row['lat'],
-                'lon': row['lon'],
-                'total_jobs': int(row['total_jobs']),
-                'dominant_sector': sector_name,
-                'sector_color': sector_color,
-                'dominant_jobs': int(row['dominant_jobs'])
-            })
+        block_points = block_df.merge(block_centroids, on='block', how='inner')[point_cols]
+    else:
+        block_points = pd.DataFrame(columns=point_cols).astype({
+            'lat': 'float64', 'lon': 'float64',
+            'total_jobs': block_df['total_jobs'].dtype,
+            'dominant_cns': pd.CategoricalDtype(CNS_COLS),
+            'dominant_jobs': block_df['dominant_jobs'].dtype,
+        })
     
     print(f"Block points prepared: {len(block_points):,}")
     
@@ -516,7 +601,7 @@ def create_submarket_boundaries(zip_geojson, submarket_df, zip_to_submarket):
                 pass
     
     # Create dissolved features
-    submarket_lookup = submarket_df.set_index('submarket').to_dict('index')
+    submarket_props = feature_properties(submarket_df, 'submarket')
     features = []
     
     print(f"  Dissolving {len(submarket_polygons)} submarkets...")
@@ -529,26 +614,14 @@ def create_submarket_boundaries(zip_geojson, submarket_df, zip_to_submarket):
                 if not dissolved.is_valid:
                     dissolved = dissolved.buffer(0)
                 
-                # Get submarket data
-                data = submarket_lookup.get(submarket_name, {})
-                
                 feature = {
                     'type': 'Feature',
                     'geometry': mapping(dissolved),
                     'properties': {
                         'submarket': submarket_name,
-                        'total_jobs': int(data.get('total_jobs', 0)),
-                        'dominant_sector': data.get('dominant_sector', 'None'),
-                        'sector_color': data.get('sector_color', '#333'),
-                        'concentration': round(data.get('concentration', 0) * 100, 1)
+                        **submarket_props.get(submarket_name, NO_DATA_PROPS),
                     }
                 }
-                
-                # Add sector-specific data
-                for cns, (naics, name, color) in SECTORS.items():
-                    feature['properties'][f'{name}_jobs'] = int(data.get(cns, 0))
-                    feature['properties'][f'{name}_lq'] = round(data.get(f'{cns}_lq', 0), 2)
-                
                 features.append(feature)
             except Exception as e:
                 print(f"  Warning: Failed to dissolve {submarket_name}: {e}")
@@ -562,31 +635,164 @@ def create_submarket_boundaries(zip_geojson, submarket_df, zip_to_submarket):
 
 def calculate_sector_stats(tract_df):
     """Calculate sector summary statistics."""
+    # Tracts led by each sector, counted from the category codes in one pass
+    dominant_counts = np.bincount(tract_df['dominant_cns'].cat.codes, minlength=len(CNS_COLS))
+    # County job totals for all sectors in one column-wise sum
+    totals = tract_df[CNS_COLS].to_numpy(np.int64).sum(axis=0)
     sector_stats = {}
-    for cns, (naics, name, color) in SECTORS.items():
-        total = int(tract_df[cns].sum())
-        tracts_dominant = int((tract_df['dominant_cns'] == cns).sum())
+    for i, (cns, (naics, name, color)) in enumerate(SECTORS.items()):
         sector_stats[name] = {
-            'total_jobs': total,
-            'tracts_dominant': tracts_dominant,
+            'total_jobs': int(totals[i]),
+            'tracts_dominant': int(dominant_counts[i]),
             'color': color,
-            'cns': cns
+            'cns': cns,
+            # Fill per LQ band, so the page's sector view is a lookup
+            'lq_colors': lq_colors(LQ_BAND_SAMPLES, [color] * len(LQ_BAND_SAMPLES)).tolist(),
         }
     
     return dict(sorted(sector_stats.items(), key=lambda x: -x[1]['total_jobs']))
 
 
-def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_points, sector_stats, 
-                       output_path='output/lodes_unified_map.html', include_blocks=True):
-    """Create unified map with block/tract/ZIP/submarket toggle."""
+def to_topojson(geojson, object_name):
+    """Simplified, quantized TopoJSON for a boundary layer (None if there is no layer).
+
+    Simplifying the shared arcs rather than each polygon keeps neighbouring
+    boundaries free of gaps and overlaps.
+    """
+    if not geojson:
+        return None
+    import topojson
+    return topojson.Topology(geojson, prequantize=1e5, toposimplify=TOPO_SIMPLIFY,
+                             object_name=object_name).to_dict()
+
+
+def layer_cache_paths():
+    """Boundary topology and block point cache paths, versioned on every input."""
+    key = cache_key(LAYER_SOURCES, f'format:{LEVEL_AGG_FORMAT}.{LAYER_FORMAT}', f'simplify:{TOPO_SIMPLIFY}')
+    paths = {name: LEVEL_AGG_DIR / f'unified_layer_{name}_v{key}.topo.json'
+             for name in ('tracts', 'zips', 'submarkets')}
+    paths['blocks'] = LEVEL_AGG_DIR / f'unified_layer_blocks_v{key}.parquet'
+    return paths
+
+
+def build_map_layers(tract_df, zip_df, submarket_df, block_df):
+    """Boundary topologies and block points, reusing cached copies when the inputs are unchanged."""
+    names = ('tracts', 'zips', 'submarkets')
+    paths = layer_cache_paths()
+    if all(path.exists() for path in paths.values()):
+        print("Using cached boundary topologies and block points...")
+        topos = [orjson.loads(paths[name].read_bytes()) for name in names]
+        return (*topos, pd.read_parquet(paths['blocks']))
+    
+    # Merge with boundaries
+    tract_geojson, zip_geojson, submarket_geojson, block_points = merge_data_with_boundaries(
+        tract_df, zip_df, submarket_df, block_df
+    )
+    
+    # Simplify boundaries once for both versions
+    print("Simplifying boundaries to TopoJSON...")
+    topos = [to_topojson(geojson, name)
+             for geojson, name in zip((tract_geojson, zip_geojson, submarket_geojson), names)]
+    
+    # Only cache complete layers, so missing boundaries are retried
+    if all(topo is not None for topo in topos):
+        # Re-key, since merging may have just downloaded boundaries
+        paths = layer_cache_paths()
+        for stale in LEVEL_AGG_DIR.glob('unified_layer_*_v*'):
+            stale.unlink()
+        for name, topo in zip(names, topos):
+            paths[name].write_bytes(orjson.dumps(topo, option=orjson.OPT_SERIALIZE_NUMPY))
+        block_points.to_parquet(paths['blocks'], index=False)
+        print(f"Cached boundary topologies and block points to: {LEVEL_AGG_DIR}")
+    
+    return (*topos, block_points)
+
+
+def lq_colors(lq, base_colors):
+    """Sector-view fill for arrays of LQs and '#rrggbb' base colors.
+
+    Higher LQs get brighter shades of the base color, in the bands listed
+    by LQ_BAND_SAMPLES; the page looks its fills up from these.
+    """
+    base_colors = np.asarray(base_colors, dtype=object)
+    rgb = np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)] for c in base_colors], dtype=float).reshape(-1, 3)
+    factor = np.select([lq < 0.8, lq < 1.2], [0.3, 0.6], 0.8)[:, None]
+    offset = np.select([lq < 0.8, lq < 1.2], [30, 40], 50)[:, None]
+    # Math.round rounds halves up
+    rgb = np.floor(np.minimum(255, rgb * factor + offset) + 0.5).astype(int).tolist()
+    scaled = np.array([f'rgb({r},{g},{b})' for r, g, b in rgb], dtype=object)
+    return np.select([lq == 0, lq < 0.5, lq >= 2.0], ['#1a1a1a', '#2a2a2a', base_colors], scaled)
+
+
+def block_points_columns(block_points):
+    """Block points as parallel arrays, loaded into typed arrays by the page.
+
+    Sectors are category codes into the small `sectors`/`colors` tables, and
+    filter fills are indexes into `filter_palette`. Everything the markers
+    and info panel need that does not depend on the view is precomputed:
+    the radius, the concentration (dominant sector's share of jobs, in
+    whole percent), and the sector-filter fill, which shades a block by
+    that share.
+    """
+    codes = block_points['dominant_cns'].cat.codes.to_numpy()
+    total = block_points['total_jobs'].to_numpy()
+    share = block_points['dominant_jobs'].to_numpy() / total
+    # At most 5 LQ bands per sector color, so the palette fits a byte index
+    filter_palette, filter_index = np.unique(lq_colors(share * 2, SECTOR_COLORS[codes]), return_inverse=True)
+    return {
+        'lat': block_points['lat'].round(5).to_numpy(),
+        'lon': block_points['lon'].round(5).to_numpy(),
+        'total_jobs': total,
+        # Rounded half up, like the Math.round this replaces
+        'concentration': np.floor(share * 100 + 0.5).astype(np.uint8),
+        'sector': codes,
+        'radius': np.clip(np.sqrt(total / 100), 3, 8),
+        'filter_color': filter_index.astype(np.uint8),
+        'filter_palette': filter_palette.tolist(),
+        'sectors': SECTOR_NAMES.tolist(),
+        'colors': SECTOR_COLORS.tolist(),
+    }
+
+
+def write_data_file(path, content):
+    """Write a page data file and its precompressed copies, unless they are already current.
+
+    Static servers can serve the .gz/.br copies directly (e.g. nginx
+    gzip_static / brotli_static); brotli is optional. The lite page shares
+    the full page's boundary files and reruns mostly rebuild identical
+    files, so unchanged files are not compressed again.
+    """
+    copies = {path.with_name(f'{path.name}.gz'): lambda: gzip.compress(content, compresslevel=6, mtime=0)}
+    if brotli is not None:
+        copies[path.with_name(f'{path.name}.br')] = lambda: brotli.compress(content, quality=11)
+    if path.exists() and all(copy.exists() for copy in copies) and path.read_bytes() == content:
+        return
+    path.write_bytes(content)
+    for copy, compress in copies.items():
+        copy.write_bytes(compress())
+
+
+def create_unified_map(tract_topo, zip_topo, submarket_topo, block_points, sector_stats, 
+                       output_path='output/lodes_unified_map.html', include_blocks=True, inline_data=False,
+                       webgl_blocks=False):
+    """Create unified map with block/tract/ZIP/submarket toggle.
+
+    The boundary and block data go to unified_data/ next to the HTML, which
+    must then be served over HTTP. With inline_data the data is embedded in
+    the page instead, giving one file that also opens from disk.
+
+    Block points are clustered and drawn as canvas markers for the viewport.
+    With webgl_blocks the page loads Leaflet.glify and draws every block,
+    unclustered, in one WebGL layer instead.
+    """
     
     # Limit block points for performance (top N by jobs)
     if include_blocks and len(block_points) > 10000:
-        block_points = sorted(block_points, key=lambda x: -x['total_jobs'])[:10000]
+        block_points = block_points.nlargest(10000, 'total_jobs')
         print(f"Limited to top 10,000 blocks for performance")
     
     if not include_blocks:
-        block_points = []  # Clear to reduce file size
+        block_points = block_points.iloc[:0]  # Clear to reduce file size
         print("Block layer disabled for lite version")
     
     # Build the block button HTML conditionally
@@ -594,8 +800,12 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
                 <span class="icon">⬡</span>Block
             </button>''' if include_blocks else ''
     tract_active = '' if include_blocks else ' active'
+    glify_script = ('\n    <script src="https://unpkg.com/leaflet.glify@3.3.0/dist/glify-browser.js"></script>'
+                    if include_blocks and webgl_blocks else '')
     
-    html = f'''<!DOCTYPE html>
+    # Generate HTML around the data payloads, which are streamed to the file
+    # separately rather than interpolated into one large string
+    head = f'''<!DOCTYPE html>
 <html>
 <head>
     <title>LA Employment by NAICS Sector</title>
@@ -603,6 +813,8 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />
     <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+    <script src="https://unpkg.com/topojson-client@3"></script>
+    <script src="https://unpkg.com/supercluster@8.0.1/dist/supercluster.min.js"></script>{glify_script}
     <style>
         * {{ margin: 0; padding: 0; box-sizing: border-box; }}
         body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; }}
@@ -786,7 +998,11 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
     
     <div class="info-panel" id="infoPanel">
         <h3 id="infoTitle">Hover over area</h3>
-        <div id="infoContent"></div>
+        <div id="infoContent">
+            <div><strong>Total Jobs:</strong> <span id="infoJobs"></span></div>
+            <div id="infoRow2"><strong id="infoLabel2"></strong> <span id="infoValue2"></span></div>
+            <div id="infoRow3"><strong id="infoLabel3"></strong> <span id="infoValue3"></span> <span id="infoTag"></span></div>
+        </div>
     </div>
     
     <div class="legend" id="legend">
@@ -803,25 +1019,53 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
 
     <script>
         // Data
-        const tractGeojson = {json.dumps(tract_geojson)};
-        const zipGeojson = {json.dumps(zip_geojson) if zip_geojson else 'null'};
-        const submarketGeojson = {json.dumps(submarket_geojson) if submarket_geojson else 'null'};
-        const blockPoints = {json.dumps(block_points)};
-        const sectorStats = {json.dumps(sector_stats)};
+'''
+    tail = f'''        
+        // Boundaries and block points, filled in by loadLevel() when first shown
+        let tractGeojson = null, zipGeojson = null, submarketGeojson = null;
+        let blocks = null;  // block point columns as typed arrays (full map only)
+        const levelLoads = {{}};  // data file fetch per geo level, started on first use
+        const loadedLevels = new Set();
         
         // State
         let currentGeoLevel = 'tract';
         let currentView = 'dominant';
         let selectedSector = null;
-        let currentLayer = null;
-        let blockMarkers = [];
+        let currentLayer = null;  // Leaflet layer or glify instance; both have remove()
+        let blockDrawId = 0;  // bumped to cancel an in-progress chunked block draw
+        let blockLayerKey = null;  // sector filter the current block layer was built for
+        const BLOCK_CHUNK = 2000;  // block markers built per animation frame
+        const blockFeatures = {{}};  // point features per sector filter ('' = all blocks), built on first use
+        const blockIndexes = {{}};  // supercluster index per sector filter
+        const choroplethLayers = {{}};  // boundary layer per geo level, kept while other levels are shown
         
         // Map
-        const map = L.map('map').setView([34.05, -118.25], 10);
+        // Zoom jumps between whole levels without the animated transform, so the
+        // canvas layers are drawn once per level rather than every animation frame
+        const map = L.map('map', {{
+            preferCanvas: true,
+            zoomAnimation: false,
+            wheelDebounceTime: 40,
+            wheelPxPerZoomLevel: 120
+        }}).setView([34.05, -118.25], 10);
+        // Block markers and choropleth polygons draw into one shared canvas instead of an SVG node each
+        const canvasRenderer = L.canvas({{ padding: 0.5 }});
         L.tileLayer('https://{{s}}.basemaps.cartocdn.com/dark_all/{{z}}/{{x}}/{{y}}{{r}}.png', {{
             attribution: '&copy; OpenStreetMap, &copy; CARTO'
         }}).addTo(map);
         
+        // Block clusters depend on the viewport, so re-query them after every pan/zoom
+        // (a WebGL layer, on webgl_blocks pages, draws every block and redraws itself).
+        // A burst of moveend events is coalesced into one redraw on the next frame.
+        let moveFrame = 0;
+        map.on('moveend', () => {{
+            if (currentGeoLevel !== 'block' || L.glify || moveFrame) return;
+            moveFrame = requestAnimationFrame(() => {{
+                moveFrame = 0;
+                if (currentGeoLevel === 'block') drawBlockPoints();
+            }});
+        }});
+        
         // Build sector list
         function buildSectorList() {{
             const list = document.getElementById('sectorList');
@@ -834,7 +1078,7 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
                     <div class="sector-color" style="background:${{stats.color}}"></div>
                     <div class="sector-info">
                         <div class="sector-name">${{name}}</div>
-                        <div class="sector-stats">${{stats.total_jobs.toLocaleString()}} jobs</div>
+                        <div class="sector-stats">${{fmt(stats.total_jobs)}} jobs</div>
                     </div>
                 `;
                 item.onclick = () => selectSector(name);
@@ -848,33 +1092,12 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
             return props.sector_color || '#333';
         }}
         
-        function getLQColor(lq, baseColor) {{
-            // LQ < 0.5: dark/desaturated, LQ = 1: normal, LQ > 2: bright/saturated
-            if (lq === undefined || lq === 0) return '#1a1a1a';
-            
-            const r = parseInt(baseColor.slice(1,3), 16);
-            const g = parseInt(baseColor.slice(3,5), 16);
-            const b = parseInt(baseColor.slice(5,7), 16);
-            
-            if (lq < 0.5) {{
-                // Very low LQ - dark gray
-                return '#2a2a2a';
-            }} else if (lq < 0.8) {{
-                // Below average - muted color
-                const factor = 0.3;
-                return `rgb(${{Math.round(r * factor + 30)}},${{Math.round(g * factor + 30)}},${{Math.round(b * factor + 30)}})`;
-            }} else if (lq < 1.2) {{
-                // Average - normal color at medium brightness  
-                const factor = 0.6;
-                return `rgb(${{Math.round(r * factor + 40)}},${{Math.round(g * factor + 40)}},${{Math.round(b * factor + 40)}})`;
-            }} else if (lq < 2.0) {{
-                // Above average - brighter
-                const factor = 0.8;
-                return `rgb(${{Math.round(Math.min(255, r * factor + 50))}},${{Math.round(Math.min(255, g * factor + 50))}},${{Math.round(Math.min(255, b * factor + 50))}})`;
-            }} else {{
-                // High LQ (2+) - full bright color
-                return baseColor;
-            }}
+        // Sector-view fill for an LQ: LQ < 0.5 dark, LQ = 1 normal, LQ > 2 full
+        // sector color. The band colors come precomputed in sectorStats.
+        function getLQColor(lq, sector) {{
+            const band = lq === undefined || lq === 0 ? 0
+                : lq < 0.5 ? 1 : lq < 0.8 ? 2 : lq < 1.2 ? 3 : lq < 2.0 ? 4 : 5;
+            return sectorStats[sector].lq_colors[band];
         }}
         
         // Style for choropleth
@@ -891,10 +1114,9 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
                     fillOpacity: props && props.total_jobs > 0 ? 0.7 : 0.1
                 }};
             }} else if (selectedSector) {{
-                const stats = sectorStats[selectedSector];
-                const lq = props ? (props[selectedSector + '_lq'] || 0) : 0;
+                const lq = props && props.cns_lq ? props.cns_lq[sectorIndex[selectedSector]] : 0;
                 return {{
-                    fillColor: getLQColor(lq, stats.color),
+                    fillColor: getLQColor(lq, selectedSector),
                     weight: isAggregated ? 1.5 : 0.5,
                     opacity: 0.8,
                     color: isAggregated ? '#555' : '#333',
@@ -911,71 +1133,124 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
             }}
         }}
         
-        // Highlight handlers
+        // Style cached per feature for resetHighlight; every draw or restyle refreshes it
+        function cachedChoroplethStyle(feature) {{
+            return (feature.properties._style = getChoroplethStyle(feature));
+        }}
+        
+        // Highlight handlers, registered once on the whole GeoJSON layer;
+        // e.propagatedFrom is the feature's own path
         function highlightFeature(e) {{
-            const layer = e.target;
+            const layer = e.propagatedFrom;
+            // The canvas renderer redraws just this path, and bringToFront
+            // moves it to the end of its draw order so the outline sits on top
             layer.setStyle({{ weight: 2, color: '#fff' }});
             layer.bringToFront();
-            showInfo(layer.feature.properties);
+            queueInfo(layer.feature.properties);
         }}
         
+        // Restore the style cached when the layer was drawn, rather than
+        // recomputing it through resetStyle on every mouseout
         function resetHighlight(e) {{
-            if (currentLayer) currentLayer.resetStyle(e.target);
-            hideInfo();
+            e.propagatedFrom.setStyle(e.propagatedFrom.feature.properties._style);
+            queueInfo(null);
+        }}
+        
+        // Hover updates the info panel at most once per frame, with the latest
+        // feature (or hides it when props is null)
+        let infoFrame = 0, infoProps = null;
+        function queueInfo(props) {{
+            infoProps = props;
+            if (infoFrame) return;
+            infoFrame = requestAnimationFrame(() => {{
+                infoFrame = 0;
+                if (infoProps) showInfo(infoProps);
+                else hideInfo();
+            }});
+        }}
+        
+        // Job counts formatted with one shared Intl.NumberFormat, cached per value
+        // since hovering keeps showing the same numbers
+        const numberFormat = new Intl.NumberFormat();
+        const formatted = new Map();
+        function fmt(n) {{
+            let text = formatted.get(n);
+            if (text === undefined) {{
+                text = numberFormat.format(n);
+                formatted.set(n, text);
+            }}
+            return text;
+        }}
+        
+        // Info panel nodes, looked up once; showInfo only sets their text
+        const infoEls = Object.fromEntries(
+            ['infoPanel', 'infoTitle', 'infoJobs', 'infoRow2', 'infoLabel2', 'infoValue2',
+             'infoRow3', 'infoLabel3', 'infoValue3', 'infoTag'].map(id => [id, document.getElementById(id)]));
+        
+        // Fill an info row from [label, value], or hide it when there is none
+        function setInfoRow(n, fields) {{
+            infoEls['infoRow' + n].hidden = !fields;
+            if (!fields) return;
+            infoEls['infoLabel' + n].textContent = fields[0];
+            infoEls['infoValue' + n].textContent = fields[1];
         }}
         
         function showInfo(props) {{
-            const panel = document.getElementById('infoPanel');
-            const title = document.getElementById('infoTitle');
-            const content = document.getElementById('infoContent');
-            
             let areaName = '';
             if (currentGeoLevel === 'tract') areaName = 'Tract ' + (props.BASENAME || props.GEOID || '');
             else if (currentGeoLevel === 'zip') areaName = 'ZIP ' + (props.zip || props.ZCTA5 || '');
             else if (currentGeoLevel === 'submarket') areaName = props.submarket || 'Submarket';
-            else areaName = 'Block';
-            
-            title.textContent = areaName;
+            else areaName = props.point_count ? `${{fmt(props.point_count)}} blocks` : 'Block';
             
-            let html = `<strong>Total Jobs:</strong> ${{(props.total_jobs || 0).toLocaleString()}}<br>`;
+            infoEls.infoTitle.textContent = areaName;
+            infoEls.infoJobs.textContent = fmt(props.total_jobs || 0);
             
+            let row2 = null, row3 = null, tag = null;  // rows are [label, value], tag is [text, color]
             if (currentView === 'dominant') {{
-                html += `<strong>Dominant:</strong> ${{props.dominant_sector || 'None'}}<br>`;
-                if (props.concentration) html += `<strong>Concentration:</strong> ${{props.concentration}}%`;
+                row2 = ['Dominant:', props.dominant_sector || 'None'];
+                if (props.concentration) row3 = ['Concentration:', `${{props.concentration}}%`];
             }} else if (selectedSector) {{
                 // Blocks don't have per-sector data - show concentration instead
                 if (currentGeoLevel === 'block') {{
-                    html += `<strong>Dominant:</strong> ${{props.dominant_sector || 'None'}}<br>`;
-                    html += `<strong>Concentration:</strong> ${{props.concentration || 0}}%`;
-                    if (props.concentration >= 60) html += ' <span style="color:#2ecc71">● Highly concentrated</span>';
-                    else if (props.concentration >= 40) html += ' <span style="color:#f39c12">● Moderately concentrated</span>';
+                    row2 = ['Dominant:', props.dominant_sector || 'None'];
+                    row3 = ['Concentration:', `${{props.concentration || 0}}%`];
+                    if (props.concentration >= 60) tag = ['● Highly concentrated', '#2ecc71'];
+                    else if (props.concentration >= 40) tag = ['● Moderately concentrated', '#f39c12'];
                 }} else {{
                     // Tract/ZIP/Submarket have per-sector LQ data
-                    const jobs = props[selectedSector + '_jobs'] || 0;
-                    const lq = props[selectedSector + '_lq'] || 0;
-                    html += `<strong>${{selectedSector}}:</strong> ${{jobs.toLocaleString()}} jobs<br>`;
-                    html += `<strong>Location Quotient:</strong> ${{lq.toFixed(2)}}`;
-                    if (lq > 1.5) html += ' <span style="color:#2ecc71">● Specialized</span>';
-                    else if (lq < 0.5) html += ' <span style="color:#e74c3c">● Underrepresented</span>';
+                    const i = sectorIndex[selectedSector];
+                    const jobs = props.cns_jobs ? props.cns_jobs[i] : 0;
+                    const lq = props.cns_lq ? props.cns_lq[i] : 0;
+                    row2 = [`${{selectedSector}}:`, `${{fmt(jobs)}} jobs`];
+                    row3 = ['Location Quotient:', lq.toFixed(2)];
+                    if (lq > 1.5) tag = ['● Specialized', '#2ecc71'];
+                    else if (lq < 0.5) tag = ['● Underrepresented', '#e74c3c'];
                 }}
             }}
+            setInfoRow(2, row2);
+            setInfoRow(3, row3);
+            infoEls.infoTag.hidden = !tag;
+            if (tag) {{
+                infoEls.infoTag.textContent = tag[0];
+                infoEls.infoTag.style.color = tag[1];
+            }}
             
-            content.innerHTML = html;
-            panel.classList.add('visible');
+            infoEls.infoPanel.classList.add('visible');
         }}
         
         function hideInfo() {{
-            document.getElementById('infoPanel').classList.remove('visible');
+            infoEls.infoPanel.classList.remove('visible');
         }}
         
         // Clear all layers
         function clearLayers() {{
             if (currentLayer) {{
-                map.removeLayer(currentLayer);
+                currentLayer.remove();
                 currentLayer = null;
             }}
-            blockMarkers.forEach(m => map.removeLayer(m));
-            blockMarkers = [];
+            blockDrawId++;
+            document.getElementById('loading').classList.remove('visible');
+            map.getContainer().style.willChange = '';
         }}
         
         // Draw choropleth (tract or ZIP)
@@ -987,78 +1262,249 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
                 return;
             }}
             
-            currentLayer = L.geoJSON(geojson, {{
-                style: getChoroplethStyle,
-                onEachFeature: (feature, layer) => {{
-                    layer.on({{
-                        mouseover: highlightFeature,
-                        mouseout: resetHighlight
-                    }});
-                }}
-            }}).addTo(map);
+            // Each level's layer is built once; switching back to it only restyles
+            // it for the current view, without rebuilding the feature paths
+            let layer = choroplethLayers[currentGeoLevel];
+            if (layer) {{
+                layer.setStyle(cachedChoroplethStyle);
+            }} else {{
+                layer = choroplethLayers[currentGeoLevel] = L.geoJSON(geojson, {{
+                    renderer: canvasRenderer,
+                    style: cachedChoroplethStyle
+                }}).on({{
+                    mouseover: highlightFeature,
+                    mouseout: resetHighlight
+                }});
+            }}
+            currentLayer = layer.addTo(map);
         }}
         
         // Draw block points
         function drawBlockPoints() {{
-            clearLayers();
+            if (L.glify) {{
+                clearLayers();
+                drawBlockPointsGL();
+                return;
+            }}
             
-            const showLoading = blockPoints.length > 5000;
-            if (showLoading) document.getElementById('loading').classList.add('visible');
+            const drawId = ++blockDrawId;  // cancels any draw still in progress
+            const key = blockFilterKey();
+            const features = getBlockClusters();
+            const showLoading = features.length > 5000;
+            if (showLoading) {{
+                document.getElementById('loading').classList.add('visible');
+                map.getContainer().style.willChange = 'transform';
+            }}
             
-            setTimeout(() => {{
-                blockPoints.forEach((pt, i) => {{
-                    // In sector filter mode, only show blocks where that sector is dominant
-                    if (currentView === 'filter' && selectedSector && pt.dominant_sector !== selectedSector) {{
-                        return;
-                    }}
-                    
-                    // Calculate concentration (0-1) for intensity
-                    const concentration = pt.dominant_jobs / pt.total_jobs;
-                    
-                    let color, opacity;
-                    if (currentView === 'dominant') {{
-                        color = pt.sector_color;
-                        opacity = 0.7;
-                    }} else if (selectedSector && pt.dominant_sector === selectedSector) {{
-                        // Use concentration to vary color intensity via getLQColor
-                        // concentration 0.3 → LQ~0.6 (dim), concentration 0.8 → LQ~1.6 (bright)
-                        const pseudoLQ = concentration * 2;  
-                        color = getLQColor(pseudoLQ, sectorStats[selectedSector].color);
-                        opacity = 0.85;
-                    }} else {{
-                        color = '#333';
-                        opacity = 0.2;
-                    }}
-                    
-                    const radius = Math.max(3, Math.min(8, Math.sqrt(pt.total_jobs / 100)));
-                    
-                    const marker = L.circleMarker([pt.lat, pt.lon], {{
-                        radius: radius,
-                        fillColor: color,
-                        color: '#000',
-                        weight: 0.5,
-                        fillOpacity: opacity
+            // One GeoJSON layer holds every marker, so clearLayers() removes it in one call.
+            // It is filled a chunk per frame and only replaces the current layer once
+            // complete, so the map keeps showing the old markers while it builds.
+            const group = L.geoJSON(null, {{
+                pointToLayer: (feature, latlng) => {{
+                    const pt = blockProps(feature.properties);
+                    return L.circleMarker(latlng, {{
+                        renderer: canvasRenderer,
+                        radius: pt.cluster
+                            ? Math.max(5, Math.min(22, Math.sqrt(pt.total_jobs / 100)))
+                            : pt._r,
+                        // Fill only; the outline is drawn just for the hovered marker
+                        stroke: false,
+                        ...blockFill(pt)
                     }});
-                    
-                    marker.on('mouseover', () => {{
-                        showInfo({{
+                }}
+            }}).on({{
+                // One pair of handlers for the whole layer; marker events bubble up to it
+                mouseover: e => {{
+                    e.propagatedFrom.setStyle({{ stroke: true, weight: 1, color: '#fff' }});
+                    queueInfo(blockInfo(blockProps(e.propagatedFrom.feature.properties)));
+                }},
+                mouseout: e => {{
+                    e.propagatedFrom.setStyle({{ stroke: false }});
+                    queueInfo(null);
+                }}
+            }});
+            
+            let start = 0;
+            function addChunk() {{
+                if (drawId !== blockDrawId) return;  // superseded by another draw
+                group.addData(features.slice(start, start + BLOCK_CHUNK));
+                start += BLOCK_CHUNK;
+                if (start < features.length) {{
+                    requestAnimationFrame(addChunk);
+                    return;
+                }}
+                clearLayers();
+                currentLayer = group.addTo(map);
+                blockLayerKey = key;
+            }}
+            requestAnimationFrame(addChunk);
+        }}
+        
+        // Draw every block point in one WebGL layer (webgl_blocks pages load Leaflet.glify)
+        function drawBlockPointsGL() {{
+            const points = visibleBlocks();
+            if (!points.length) return;
+            
+            currentLayer = L.glify.points({{
+                map,
+                data: {{ type: 'FeatureCollection', features: points }},
+                // GeoJSON coordinates are [lon, lat]; glify reads latitude first by default
+                latitudeKey: 1,
+                longitudeKey: 0,
+                // glify sizes are diameters in pixels
+                size: i => blocks.radius[points[i].properties.i] * 2,
+                color: i => glColor(blockFill(blockProps(points[i].properties)).fillColor),
+                // Every block drawn in one view shares the same opacity
+                opacity: blockFill(blockProps(points[0].properties)).fillOpacity,
+                hover: (e, feature) => queueInfo(blockInfo(blockProps(feature.properties))),
+                hoverOff: () => queueInfo(null)
+            }});
+        }}
+        
+        // CSS color ('#rgb', '#rrggbb' or 'rgb(r,g,b)') as the 0-1 channels glify expects
+        const glColors = {{}};
+        function glColor(css) {{
+            if (!glColors[css]) {{
+                const hex = css.length === 4 ? css.replace(/[0-9a-f]/gi, '$&$&') : css;
+                const rgb = hex[0] === '#'
+                    ? [1, 3, 5].map(i => parseInt(hex.slice(i, i + 2), 16))
+                    : hex.slice(4, -1).split(',').map(Number);
+                glColors[css] = {{ r: rgb[0] / 255, g: rgb[1] / 255, b: rgb[2] / 255 }};
+            }}
+            return glColors[css];
+        }}
+        
+        // Info panel fields for a block point or cluster; a cluster's
+        // concentration is the job-weighted mean of its blocks'
+        function blockInfo(pt) {{
+            return {{
+                total_jobs: pt.total_jobs,
+                dominant_sector: pt.dominant_sector,
+                concentration: pt.cluster ? Math.round(pt.weighted_concentration / pt.total_jobs) : pt.concentration,
+                point_count: pt.point_count
+            }};
+        }}
+        
+        // Which blocks the current view shows: '' for all, else the filtered sector
+        function blockFilterKey() {{
+            return currentView === 'filter' && selectedSector ? selectedSector : '';
+        }}
+        
+        // Point properties for block i, read from the columns (clusters pass through)
+        function blockProps(p) {{
+            if (p.cluster) return p;
+            const i = p.i, s = blocks.sector[i];
+            return {{
+                total_jobs: blocks.totalJobs[i],
+                concentration: blocks.concentration[i],
+                dominant_sector: blocks.sectors[s],
+                sector_color: blocks.colors[s],
+                _r: blocks.radius[i],
+                _f: blocks.filterPalette[blocks.filterColor[i]]
+            }};
+        }}
+        
+        // Point features (carrying only the block's index) shown in the current view.
+        // In sector filter mode, only show blocks where that sector is dominant.
+        function visibleBlocks() {{
+            if (!blocks) return [];
+            const key = blockFilterKey();
+            if (!blockFeatures[key]) {{
+                const sel = key ? sectorIndex[key] : -1;
+                const features = [];
+                for (let i = 0; i < blocks.n; i++) {{
+                    if (sel >= 0 && blocks.sector[i] !== sel) continue;
+                    features.push({{
+                        type: 'Feature',
+                        geometry: {{ type: 'Point', coordinates: [blocks.lon[i], blocks.lat[i]] }},
+                        properties: {{ i }}
+                    }});
+                }}
+                blockFeatures[key] = features;
+            }}
+            return blockFeatures[key];
+        }}
+        
+        // Block points (or clusters of them) for the current viewport and zoom.
+        // Each sector filter gets its own index, built the first time it is shown.
+        function getBlockClusters() {{
+            const key = blockFilterKey();
+            if (!blockIndexes[key]) {{
+                const points = visibleBlocks();
+                // Clusters carry summed jobs (and job-weighted concentration) and the
+                // sector/color of their largest block
+                blockIndexes[key] = new Supercluster({{
+                    radius: 60,
+                    maxZoom: 14,
+                    map: p => {{
+                        const pt = blockProps(p);
+                        return {{
                             total_jobs: pt.total_jobs,
+                            weighted_concentration: pt.concentration * pt.total_jobs,
                             dominant_sector: pt.dominant_sector,
-                            concentration: Math.round(pt.dominant_jobs / pt.total_jobs * 100)
-                        }});
-                    }});
-                    marker.on('mouseout', hideInfo);
-                    
-                    marker.addTo(map);
-                    blockMarkers.push(marker);
-                }});
-                
-                if (showLoading) document.getElementById('loading').classList.remove('visible');
-            }}, 50);
+                            sector_color: pt.sector_color,
+                            top_jobs: pt.total_jobs
+                        }};
+                    }},
+                    reduce: (acc, p) => {{
+                        acc.total_jobs += p.total_jobs;
+                        acc.weighted_concentration += p.weighted_concentration;
+                        if (p.top_jobs > acc.top_jobs) {{
+                            acc.top_jobs = p.top_jobs;
+                            acc.dominant_sector = p.dominant_sector;
+                            acc.sector_color = p.sector_color;
+                        }}
+                    }}
+                }}).load(points);
+            }}
+            const bbox = map.getBounds().pad(0.5).toBBoxString().split(',').map(Number);
+            return blockIndexes[key].getClusters(bbox, map.getZoom());
+        }}
+        
+        // Fill color/opacity for a block point in the current view
+        function blockFill(pt) {{
+            let color, opacity;
+            if (currentView === 'dominant') {{
+                color = pt.sector_color;
+                opacity = 0.7;
+            }} else if (selectedSector && pt.dominant_sector === selectedSector) {{
+                // Use concentration (0-1) to vary color intensity via getLQColor
+                // concentration 0.3 → LQ~0.6 (dim), concentration 0.8 → LQ~1.6 (bright).
+                // Single blocks carry it precomputed; clusters use their job-weighted mean.
+                color = pt.cluster
+                    ? getLQColor(pt.weighted_concentration / pt.total_jobs / 50, selectedSector)
+                    : pt._f;
+                opacity = 0.85;
+            }} else {{
+                color = '#333';
+                opacity = 0.2;
+            }}
+            return {{ fillColor: color, fillOpacity: opacity }};
         }}
         
         // Draw map based on current state
         function drawMap() {{
+            const level = currentGeoLevel;
+            if (!loadedLevels.has(level)) {{
+                // Draw once this level's data arrives, unless the user has moved on.
+                // The previous level comes off the map meanwhile, since hovering it
+                // would fill the info panel with this level's lookups.
+                clearLayers();
+                queueInfo(null);
+                document.getElementById('loading').classList.add('visible');
+                loadLevel(level).then(() => {{
+                    if (currentGeoLevel !== level) return;
+                    document.getElementById('loading').classList.remove('visible');
+                    drawMap();
+                }}).catch(err => {{
+                    document.getElementById('loading').classList.remove('visible');
+                    alert(location.protocol === 'file:'
+                        ? 'This map loads its data files, so it has to be served over HTTP ' +
+                          '(e.g. python -m http.server), or use the standalone version.'
+                        : `Could not load the map data: ${{err.message}}`);
+                }});
+                return;
+            }}
             if (currentGeoLevel === 'block') {{
                 drawBlockPoints();
             }} else if (currentGeoLevel === 'tract') {{
@@ -1091,12 +1537,29 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
         
         // Geo level toggle
         function setGeoLevel(level) {{
+            if (level === currentGeoLevel && currentLayer) return;
             currentGeoLevel = level;
             document.querySelectorAll('.geo-btn').forEach(btn => btn.classList.remove('active'));
             document.getElementById('btn-' + level).classList.add('active');
             drawMap();
         }}
         
+        // Apply a view/sector change. Choropleths and block layers showing the same
+        // blocks are restyled in place; only a different block set is rebuilt.
+        function refreshMap() {{
+            if (!loadedLevels.has(currentGeoLevel)) return;  // drawn with the current state once loaded
+            if (currentLayer && currentGeoLevel !== 'block') {{
+                currentLayer.setStyle(cachedChoroplethStyle);
+            }} else if (currentLayer && !L.glify && blockLayerKey === blockFilterKey()) {{
+                // The canvas renderer batches these into one repaint
+                currentLayer.eachLayer(layer => layer.setStyle(blockFill(blockProps(layer.feature.properties))));
+            }} else {{
+                drawMap();
+                return;
+            }}
+            updateLegend();
+        }}
+        
         // View toggle
         function setView(view) {{
             currentView = view;
@@ -1107,17 +1570,129 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
                 selectedSector = null;
                 buildSectorList();
             }}
-            drawMap();
+            refreshMap();
         }}
         
         // Select sector
         function selectSector(name) {{
+            selectedSector = name;
+            buildSectorList();
             if (currentView === 'dominant') {{
                 setView('filter');
+            }} else {{
+                refreshMap();
             }}
-            selectedSector = name;
-            buildSectorList();
-            drawMap();
+        }}
+        
+        // Decoded form of a data file: boundaries are TopoJSON, decoded once for
+        // L.geoJSON; block columns become typed arrays. Also runs in the worker.
+        function decodeLevelData(name, data) {{
+            if (!data) return null;
+            if (name !== 'blocks') return topojson.feature(data, data.objects[name]);
+            return {{
+                n: data.lat.length,
+                lat: new Float32Array(data.lat),
+                lon: new Float32Array(data.lon),
+                totalJobs: new Uint32Array(data.total_jobs),
+                concentration: new Uint8Array(data.concentration),
+                sector: new Uint8Array(data.sector),
+                radius: new Float32Array(data.radius),
+                filterColor: new Uint8Array(data.filter_color),
+                filterPalette: data.filter_palette,
+                sectors: data.sectors,
+                colors: data.colors
+            }};
+        }}
+        
+        function fetchJSON(url) {{
+            return fetch(url).then(r => {{
+                if (!r.ok) throw new Error(`HTTP ${{r.status}} fetching ${{url}}`);
+                return r.json();
+            }});
+        }}
+        
+        function decodeInline(name, url) {{
+            return fetchJSON(url).then(data => decodeLevelData(name, data));
+        }}
+        
+        // Fetching, JSON parsing and decoding run in a worker so they don't block
+        // the main thread; block typed arrays are transferred back without a copy.
+        // Without worker support the same decode runs inline.
+        let dataWorker = null;
+        try {{
+            dataWorker = window.Worker && new Worker(URL.createObjectURL(new Blob([
+                `importScripts('https://unpkg.com/topojson-client@3');
+                ${{fetchJSON}}
+                ${{decodeLevelData}}
+                onmessage = async e => {{
+                    const {{ name, url }} = e.data;
+                    try {{
+                        const result = decodeLevelData(name, await fetchJSON(url));
+                        const buffers = name === 'blocks'
+                            ? Object.values(result).filter(v => ArrayBuffer.isView(v)).map(v => v.buffer)
+                            : [];
+                        postMessage({{ name, result }}, buffers);
+                    }} catch (err) {{
+                        postMessage({{ name, error: err.message || String(err) }});
+                    }}
+                }};`
+            ], {{ type: 'text/javascript' }})));
+        }} catch (err) {{
+            dataWorker = null;  // e.g. blob: workers blocked by a content security policy
+        }}
+        const pendingDecodes = {{}};
+        if (dataWorker) {{
+            dataWorker.onmessage = e => {{
+                const {{ name, result, error }} = e.data;
+                const pending = pendingDecodes[name];
+                delete pendingDecodes[name];
+                if (error) pending.reject(new Error(error));
+                else pending.resolve(result);
+            }};
+            // The worker itself failed (e.g. topojson-client didn't load): stop
+            // using it and decode the outstanding files inline instead
+            dataWorker.onerror = () => {{
+                dataWorker.terminate();
+                dataWorker = null;
+                for (const [name, {{ url, resolve, reject }}] of Object.entries(pendingDecodes)) {{
+                    delete pendingDecodes[name];
+                    decodeInline(name, url).then(resolve, reject);
+                }}
+            }};
+        }}
+        
+        function fetchLevelData(name, url) {{
+            if (!dataWorker) return decodeInline(name, url);
+            return new Promise((resolve, reject) => {{
+                pendingDecodes[name] = {{ url, resolve, reject }};
+                // Resolved here, since the worker's blob: URL has no base for relative paths
+                dataWorker.postMessage({{ name, url: new URL(url, location.href).href }});
+            }});
+        }}
+        
+        // Fetch and decode a geo level's data file the first time it is shown, so
+        // the page only downloads the levels the user looks at
+        function loadLevel(level) {{
+            if (!levelLoads[level]) {{
+                const name = {{ tract: 'tracts', zip: 'zips', submarket: 'submarkets', block: 'blocks' }}[level];
+                const url = dataFiles[name];
+                // Standalone pages carry their data inline; decode it in place
+                const data = inlineData && inlineData[name];
+                const load = data ? Promise.resolve(decodeLevelData(name, data))
+                    : url ? fetchLevelData(name, url) : Promise.resolve(null);
+                levelLoads[level] = load.then(result => {{
+                    if (level === 'block') blocks = result;
+                    else if (level === 'tract') tractGeojson = result;
+                    else if (level === 'zip') zipGeojson = result;
+                    else submarketGeojson = result;
+                    loadedLevels.add(level);
+                }}, err => {{
+                    // Forget the failed load, so showing the level again retries it
+                    delete levelLoads[level];
+                    throw err;
+                }});
+            }}
+            return levelLoads[level];
         }}
         
         // Init
@@ -1127,11 +1702,39 @@ def create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_poin
 </body>
 </html>'''
     
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w') as f:
-        f.write(html)
-    
-    print(f"\n✅ Unified map saved to: {output_path}")
+    # Large layers go to separate files the page fetches, so the HTML itself
+    # stays small and the browser can download and parse them in parallel
+    data_dir = Path(output_path).parent / DATA_DIR_NAME
+    data_files = {}
+    inline = {} if inline_data else None
+    for name, data in (('tracts', tract_topo), ('zips', zip_topo), ('submarkets', submarket_topo),
+                       ('blocks', block_points_columns(block_points) if include_blocks else None)):
+        data_files[name] = None
+        if data and inline_data:
+            inline[name] = data
+        elif data:
+            file_name = f'{name}.topo.json' if name != 'blocks' else 'blocks.json'
+            data_dir.mkdir(parents=True, exist_ok=True)
+            write_data_file(data_dir / file_name, orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY))
+            data_files[name] = f'{DATA_DIR_NAME}/{file_name}'
+    
+    payloads = (
+        ('dataFiles', data_files),
+        ('inlineData', inline),
+        ('sectorStats', sector_stats),
+        ('sectorIndex', {SECTORS[cns][1]: i for i, cns in enumerate(CNS_COLS)}),
+    )
+    with open(output_path, 'wb') as f:
+        f.write(head.encode())
+        for var, payload in payloads:
+            f.write(f'        const {var} = '.encode())
+            # Escaping '</' keeps a '</script>' inside a string from closing the tag
+            f.write(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY).replace(b'</', b'<\\/'))
+            f.write(b';\n')
+        f.write(tail.encode())
+    
+    print(f"\n✅ Unified map saved to: {output_path}"
+          + (" (data inline)" if inline_data else f" (data in {data_dir})"))
     return output_path
 
 
@@ -1140,12 +1743,11 @@ def main():
     print("LODES Unified Map - Block/Tract/ZIP/Submarket Views")
     print("=" * 60)
     
-    # Load and aggregate data
-    df = load_lodes_data()
-    block_df, tract_df, zip_df, submarket_df = aggregate_to_levels(df)
+    # Load and aggregate data (cached between runs)
+    block_df, tract_df, zip_df, submarket_df = load_levels()
     
-    # Merge with boundaries
-    tract_geojson, zip_geojson, submarket_geojson, block_points = merge_data_with_boundaries(
+    # Boundaries merged with the data and simplified (cached between runs)
+    tract_topo, zip_topo, submarket_topo, block_points = build_map_layers(
         tract_df, zip_df, submarket_df, block_df
     )
     
@@ -1153,16 +1755,24 @@ def main():
     sector_stats = calculate_sector_stats(tract_df)
     
     # Create FULL map (with blocks)
-    create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_points, sector_stats,
+    create_unified_map(tract_topo, zip_topo, submarket_topo, block_points, sector_stats,
                        output_path='output/lodes_unified_map.html', include_blocks=True)
     
     # Create LITE map (no blocks - faster loading)
-    create_unified_map(tract_geojson, zip_geojson, submarket_geojson, block_points, sector_stats,
+    create_unified_map(tract_topo, zip_topo, submarket_topo, block_points, sector_stats,
                        output_path='output/lodes_unified_map_lite.html', include_blocks=False)
     
+    # Create STANDALONE map (full map with its data inline, for docs/ and file://)
+    create_unified_map(tract_topo, zip_topo, submarket_topo, block_points, sector_stats,
+                       output_path='output/lodes_unified_map_standalone.html', include_blocks=True,
+                       inline_data=True)
+    
     print("\n✅ Done!")
     print("\nFull version: output/lodes_unified_map.html")
     print("Lite version: output/lodes_unified_map_lite.html (faster, no blocks)")
+    print("Serve output/ over HTTP to view them (e.g. python -m http.server -d output),")
+    print("since the pages fetch their data files from output/unified_data/")
+    print("Standalone version: output/lodes_unified_map_standalone.html (single file, opens from disk)")
 
 
 if __name__ == '__main__':